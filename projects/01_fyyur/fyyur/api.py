@@ -0,0 +1,194 @@
+"""Async, read-only JSON API served as a separate ASGI app.
+
+    uvicorn api:asgi_app --port 5001
+
+Routes:
+
+    GET /api/v1/venues?after=<id>&limit=<n>
+    GET /api/v1/artists/<id>
+    GET /api/v1/shows?after=<iso start_time>,<id>&limit=<n>
+
+The app uses the tables from ``models.py`` through an async SQLAlchemy
+engine on ``asyncpg``, pooled in the server's event loop, so a slow query
+only parks its coroutine and does not hold a worker thread. Independent
+queries, such as an artist and its past and upcoming shows, are sent
+concurrently on separate pooled connections. The pool is sized by the same
+``DB_*`` settings as the Flask app (see ``config.py``).
+"""
+import asyncio
+import json
+import re
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import config
+import serializers
+from models import Venue, Artist, Show
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+venues = Venue.__table__
+artists = Artist.__table__
+shows = Show.__table__
+
+engine = None
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+def async_database_url(url):
+    """``url`` with its driver swapped for ``asyncpg``."""
+    return make_url(url).set(drivername='postgresql+asyncpg')
+
+
+def startup():
+    global engine
+    options = {key: value for key, value in config.SQLALCHEMY_ENGINE_OPTIONS.items()
+               if key != 'connect_args'}
+    options['connect_args'] = {'server_settings': {
+        'statement_timeout': str(config.DB_STATEMENT_TIMEOUT_MS)}}
+    engine = create_async_engine(async_database_url(config.SQLALCHEMY_DATABASE_URI), **options)
+
+
+async def shutdown():
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+
+async def fetch(statement, schema):
+    async with engine.connect() as conn:
+        result = await conn.execute(statement)
+        return schema.dump_rows(result.all())
+
+
+def page_limit(query):
+    try:
+        limit = int(query.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise HTTPError(400, 'limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def page(items, limit, cursor):
+    """Trim the one-past-the-end probe row and build the next cursor."""
+    next_cursor = cursor(items[limit - 1]) if len(items) > limit else None
+    return {'data': items[:limit], 'next': next_cursor}
+
+
+async def list_venues(query):
+    limit = page_limit(query)
+    statement = select(venues.c.id, venues.c.name, venues.c.city, venues.c.state,
+                       venues.c.upcoming_shows_count).\
+        order_by(venues.c.id).limit(limit + 1)
+    if 'after' in query:
+        try:
+            statement = statement.where(venues.c.id > int(query['after']))
+        except ValueError:
+            raise HTTPError(400, 'after must be a venue id')
+    return page(await fetch(statement, serializers.API_VENUE), limit,
+                lambda venue: str(venue['id']))
+
+
+async def get_artist(artist_id):
+    now = datetime.now()
+    shows_query = select(shows.c.start_time, venues.c.id.label('venue_id'),
+                         venues.c.name.label('venue_name'),
+                         venues.c.image_link.label('venue_image_link')).\
+        join(venues, shows.c.venue_id == venues.c.id).\
+        where(shows.c.artist_id == artist_id).\
+        order_by(shows.c.start_time)
+    found, past_shows, upcoming_shows = await asyncio.gather(
+        fetch(select(artists).where(artists.c.id == artist_id), serializers.API_ARTIST),
+        fetch(shows_query.where(shows.c.start_time <= now), serializers.API_ARTIST_SHOW),
+        fetch(shows_query.where(shows.c.start_time > now), serializers.API_ARTIST_SHOW),
+    )
+    if not found:
+        raise HTTPError(404, 'artist not found')
+    artist = found[0]
+    artist.update(past_shows=past_shows, upcoming_shows=upcoming_shows)
+    return artist
+
+
+async def list_shows(query):
+    limit = page_limit(query)
+    statement = select(shows.c.id, shows.c.start_time,
+                       shows.c.venue_id, venues.c.name.label('venue_name'),
+                       shows.c.artist_id, artists.c.name.label('artist_name'),
+                       artists.c.image_link.label('artist_image_link')).\
+        join(venues, shows.c.venue_id == venues.c.id).\
+        join(artists, shows.c.artist_id == artists.c.id).\
+        order_by(shows.c.start_time, shows.c.id).limit(limit + 1)
+    if 'after' in query:
+        try:
+            after_time, after_id = query['after'].rsplit(',', 1)
+            after_key = (datetime.fromisoformat(after_time), int(after_id))
+        except ValueError:
+            raise HTTPError(400, 'after must be "<start_time>,<id>"')
+        statement = statement.where(tuple_(shows.c.start_time, shows.c.id) > after_key)
+    return page(await fetch(statement, serializers.API_SHOW), limit,
+                lambda show: '{},{}'.format(show['start_time'].isoformat(), show['id']))
+
+
+ROUTES = [
+    (re.compile(r'^/api/v1/venues$'), lambda match, query: list_venues(query)),
+    (re.compile(r'^/api/v1/artists/(\d+)$'), lambda match, query: get_artist(int(match.group(1)))),
+    (re.compile(r'^/api/v1/shows$'), lambda match, query: list_shows(query)),
+]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+async def handle(method, path, query):
+    """Return ``(status, body)`` for one request."""
+    if method != 'GET':
+        return 405, {'error': 'method not allowed'}
+    for pattern, view in ROUTES:
+        match = pattern.match(path)
+        if match:
+            try:
+                return 200, await view(match, query)
+            except HTTPError as error:
+                return error.status, {'error': error.message}
+    return 404, {'error': 'not found'}
+
+
+async def asgi_app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+    if engine is None:
+        startup()
+    query = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+    status, body = await handle(scope['method'], scope['path'], query)
+    payload = json.dumps(body, default=_json_default).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(payload)).encode())]})
+    await send({'type': 'http.response.body', 'body': payload})
@@ -3,8 +3,6 @@
 #----------------------------------------------------------------------------#
 
 import json
-import dateutil.parser
-import babel
 import os
 import sys
 
@@ -17,7 +15,8 @@ from flask import (
     redirect, 
     url_for, 
     jsonify, 
-    abort
+    abort,
+    stream_with_context
 )
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
@@ -26,133 +25,210 @@ from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
 from flask_migrate import Migrate 
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import load_only
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 from models import app, db, Venue, Artist, Show
+from cli import fyyur_cli
+from search import search_names, SEARCH_LIMIT
+from cache import ResponseCache
+import metrics
+from formatting import format_datetime
+from profiler import SQLProfiler
+from booking import book_shows, MAX_BATCH
+from facets import venue_facets, genre_key, GENRE_LABELS
+from feed import ensure_fresh, upcoming_page
+import serializers
 
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
-db = SQLAlchemy()
-app = Flask(__name__)
 app.config.from_object('config')
 moment = Moment(app)
+metrics.init_app(app, db)
 db.init_app(app)
+app.cli.add_command(fyyur_cli)
+response_cache = ResponseCache(app)
+sql_profiler = SQLProfiler(app)
+
+
+@app.teardown_request
+def shutdown_session(exception=None):
+  # one session per request: roll back whatever a failed request left
+  # open and hand the connection back to the pool
+  if exception is not None:
+    db.session.rollback()
+  db.session.remove()
+
+
+def venue_cache_groups(venue_id):
+  # pages that render this venue: its own, the listings and its artists
+  artist_ids = db.session.query(Show.artist_id).\
+      filter(Show.venue_id == venue_id).distinct()
+  return ['venues', 'shows', 'venue:{}'.format(venue_id)] + \
+      ['artist:{}'.format(artist_id) for artist_id, in artist_ids]
+
+
+def artist_cache_groups(artist_id):
+  venue_ids = db.session.query(Show.venue_id).\
+      filter(Show.artist_id == artist_id).distinct()
+  return ['artists', 'shows', 'artist:{}'.format(artist_id)] + \
+      ['venue:{}'.format(venue_id) for venue_id, in venue_ids]
+
+
+def invalidate_show_pages(venue_ids, artist_ids):
+  # pages listing the shows just booked
+  response_cache.invalidate('shows', *(
+      ['venue:{}'.format(venue_id) for venue_id in set(venue_ids)] +
+      ['artist:{}'.format(artist_id) for artist_id in set(artist_ids)]))
+
+
+def split_shows(shows, now=None):
+  # shows from an outer join: a row without a show has start_time None
+  now = now or datetime.now()
+  past_shows = []
+  upcoming_shows = []
+  for show in shows:
+    if show['start_time'] is None:
+      continue
+    (upcoming_shows if show['start_time'] > now else past_shows).append(show)
+  return {
+      'past_shows': past_shows,
+      'upcoming_shows': upcoming_shows,
+      'past_shows_count': len(past_shows),
+      'upcoming_shows_count': len(upcoming_shows)
+  }
+
+
+def show_cursor(key):
+  # keyset cursor for show listings: "<start_time isoformat>,<show id>"
+  start_time, show_id = key
+  return '{},{}'.format(start_time.isoformat(), show_id)
+
+
+def parse_show_cursor(cursor):
+  try:
+    start_time, show_id = cursor.rsplit(',', 1)
+    return datetime.fromisoformat(start_time), int(show_id)
+  except ValueError:
+    abort(400)
+
+
+def venue_cursor(row):
+  # keyset cursor for /venues: "<venue id>,<state>,<city>"; the city goes
+  # last because it may itself contain commas
+  return '{},{},{}'.format(row.id, row.state, row.city)
+
+
+def parse_venue_cursor(cursor):
+  try:
+    venue_id, state, city = cursor.split(',', 2)
+    return state, city, int(venue_id)
+  except ValueError:
+    abort(400)
 
  
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
-
 app.jinja_env.filters['datetime'] = format_datetime
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
+HOME_UPCOMING_SHOWS = 6
+
 @app.route('/')
 def index():
-  return render_template('pages/home.html')
+  ensure_fresh(app.config['FEED_MAX_STALENESS'])
+  upcoming, _ = upcoming_page(HOME_UPCOMING_SHOWS)
+  return render_template('pages/home.html', upcoming=upcoming)
 
 
 #  Venues
 #  ----------------------------------------------------------------
 
+VENUES_PER_PAGE = 200
+
 @app.route('/venues')
+@response_cache.cached('venues')
 def venues():
-  locals = []
-  venues = Venue.query.all()
-  places = Venue.query.distinct(Venue.city, Venue.state).all()
-
-  for place in places:
-      locals.append({
-          'city': place.city,
-          'state': place.state,
-          'venues': [{
-              'id': venue.id,
-              'name': venue.name,
-          } for venue in venues if
-              venue.city == place.city and venue.state == place.state]
-      })
-  return render_template('pages/venues.html', areas=locals)
+  after = request.args.get('after')
+  genre = genre_key(request.args.get('genre', '')) or None
+  state = request.args.get('state') or None
+
+  # one page of venues in (state, city, id) order, read along
+  # ix_venues_state_city; an area may carry over to the next page
+  query = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name)
+  if state:
+    query = query.filter(Venue.state == state)
+  if genre:
+    # genres @> ARRAY[genre], served by the GIN index ix_venues_genres
+    query = query.filter(Venue.genres.op('@>')(postgresql.array([genre])))
+  if after:
+    query = query.filter(
+        db.tuple_(Venue.state, Venue.city, Venue.id) > parse_venue_cursor(after))
+
+  rows = query.order_by(Venue.state, Venue.city, Venue.id).limit(VENUES_PER_PAGE + 1).all()
+
+  next_cursor = None
+  if len(rows) > VENUES_PER_PAGE:
+    rows = rows[:VENUES_PER_PAGE]
+    next_cursor = venue_cursor(rows[-1])
+
+  locals = [{
+      'city': city,
+      'state': state,
+      'venues': list(group)
+  } for (city, state), group in groupby(serializers.AREA_VENUE.dump_rows(rows),
+                                        key=itemgetter('city', 'state'))]
+
+  genre_facets, state_facets = venue_facets(genre, state)
+  return render_template('pages/venues.html', areas=locals,
+    next_cursor=next_cursor, genre=genre, state=state,
+    genre_label=GENRE_LABELS.get(genre, genre),
+    genre_facets=genre_facets, state_facets=state_facets)
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
   search_term = request.form.get('search_term', '')
-  search = request.form.get('search_term', '')
-  venues = Venue.query.filter(Venue.name.ilike("%" + search_term + "%")).all()
+  limit = max(1, min(request.form.get('limit', SEARCH_LIMIT, type=int), SEARCH_LIMIT))
+  venues = serializers.SEARCH_RESULT.dump_rows(search_names(Venue, search_term, limit))
 
   response = {
       "count": len(venues),
-      "data": []
+      "data": venues
   }
 
-  for venue in venues:
-      response["data"].append({
-          'id': venue.id,
-          'name': venue.name,
-      })
-
   return render_template('pages/search_venues.html', results=response, \
     search_term=request.form.get('search_term', ''))
 
 @app.route('/venues/<int:venue_id>')
+@response_cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
-  past_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-      filter(
-          Show.venue_id == venue_id,
-          Show.artist_id == Artist.id,
-          Show.start_time < datetime.now()
-      ).\
+  # the venue and all of its shows in one round trip; a venue without
+  # shows still comes back as a single row with NULL show columns
+  rows = db.session.query(
+      Venue,
+      Show.start_time,
+      Artist.id.label('artist_id'),
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link')
+  ).\
+      outerjoin(Show, Show.venue_id == Venue.id).\
+      outerjoin(Artist, Show.artist_id == Artist.id).\
+      filter(Venue.id == venue_id).\
+      order_by(Show.start_time).\
       all()
+  if not rows:
+    abort(404)
 
-
-  upcoming_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-      filter(
-          Show.venue_id == venue_id,
-          Show.artist_id == Artist.id,
-          Show.start_time > datetime.now()
-      ).\
-      all()
-
-  venue = Venue.query.filter_by(id=venue_id).first_or_404()
-
-  data = {
-          'id': venue.id,
-          "name": venue.name,
-          "genres": [venue.genres],
-          "city": venue.city,
-          "state": venue.state,
-          "phone": venue.phone,
-          "address": venue.address,
-          "website": venue.website,
-          "facebook_link": venue.facebook_link,
-          "seeking_talent": venue.seeking_talent,
-          "seeking_description": venue.seeking_description,
-          "image_link": venue.image_link,  
-          'past_shows': [{
-              'artist_id': artist.id,
-              "artist_name": artist.name,
-              "artist_image_link": artist.image_link,
-              "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-          } for artist, show in past_shows],
-          'upcoming_shows': [{
-              'artist_id': artist.id,
-              'artist_name': artist.name,
-              'artist_image_link': artist.image_link,
-              'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-          } for artist, show in upcoming_shows],
-          'past_shows_count': len(past_shows),
-          'upcoming_shows_count': len(upcoming_shows)
-      }
-
+  data = serializers.VENUE.dump(rows[0].Venue)
+  data.update(split_shows(serializers.VENUE_SHOW.dump_rows(rows)))
   return render_template('pages/show_venue.html', venue=data)
 
 #  Create Venue
@@ -174,14 +250,13 @@ def create_venue_submission():
       venue.seeking_talent=(form.seeking_talent.data=='y')
       db.session.add(venue)
       db.session.commit()
+      response_cache.invalidate('venues')
       flash('Venue ' + request.form['name'] + ' was successfully listed!')
 
     except ValueError as e:
         print(e)
         db.session.rollback()
         flash('An error occurred. Artist could not be listed.')
-    finally:
-      db.session.close()
   else:
     message = []
     for field, err in form.errors.items():
@@ -196,9 +271,14 @@ def create_venue_submission():
 @app.route('/venues/<venue_id>', methods=['POST'])
 def delete_venue(venue_id):
   try:
+    # loads the venue row only: its shows go by ON DELETE CASCADE
     venue = Venue.query.get(venue_id)
+    if venue is None:
+      abort(404)
+    cache_groups = venue_cache_groups(venue.id)
     db.session.delete(venue)
     db.session.commit()
+    response_cache.invalidate(*cache_groups)
     flash('Venue was successfully deleted!')
     return render_template('pages/home.html')
   except ValueError as e:
@@ -206,94 +286,96 @@ def delete_venue(venue_id):
     print(e)
     db.session.rollback()
     flash('Error : Venue could not be deleted!')
-  finally:
-    db.session.close()
   return redirect(url_for('venues'))
 
 
 #  Artists
 #  ----------------------------------------------------------------
+ARTISTS_PER_PAGE = 50
+MAX_ARTISTS_PER_PAGE = 500
+
+
+class KeysetPage(object):
+  """Yields at most `limit` rows from a query that asks for `limit + 1`,
+  and records the cursor of the next page once iteration reaches it."""
+
+  def __init__(self, rows, limit):
+    self.rows = rows
+    self.limit = limit
+    self.next_after = None
+
+  def __iter__(self):
+    last_id = None
+    try:
+      for count, row in enumerate(self.rows):
+        if count == self.limit:
+          self.next_after = last_id
+          break
+        last_id = row.id
+        yield row
+    finally:
+      # the query is bound to the view's session, which the streamed
+      # context's teardown does not remove; close it to free the connection
+      self.rows.session.close()
+
+
 @app.route('/artists')
+@response_cache.cached('artists')
 def artists():
-  query = Artist.query.all()
-  return render_template('pages/artists.html', artists=query)
+  after = request.args.get('after', 0, type=int)
+  limit = max(1, min(request.args.get('limit', ARTISTS_PER_PAGE, type=int), MAX_ARTISTS_PER_PAGE))
+  query = Artist.query.\
+      options(load_only(Artist.id, Artist.name)).\
+      filter(Artist.id > after).\
+      order_by(Artist.id).\
+      limit(limit + 1).\
+      yield_per(100)
+
+  # rendered while rows are fetched, so memory does not grow with the page
+  context = {'artists': KeysetPage(query, limit), 'limit': limit}
+  app.update_template_context(context)
+  stream = app.jinja_env.get_template('pages/artists.html').stream(context)
+  stream.enable_buffering(20)
+  return Response(stream_with_context(stream))
 
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
   search_term = request.form.get('search_term', '')
-  search = "%{}%".format(search_term)
-  query = Artist.query.filter(Artist.name.ilike(search)).all()
-  query_length = len(query)
+  limit = max(1, min(request.form.get('limit', SEARCH_LIMIT, type=int), SEARCH_LIMIT))
+  artists = serializers.SEARCH_RESULT.dump_rows(search_names(Artist, search_term, limit))
 
   response = {
-    "count": query_length,
-    "data": []
+    "count": len(artists),
+    "data": artists
   }
 
-  for i in range (query_length):
-    item={}
-    item['id'] = query[i].id
-    item['name'] = query[i].name
-    item['num_upcoming_shows'] = 0
-    response['data'].append(item)
-
   return render_template('pages/search_artists.html', results=response, \
     search_term=request.form.get('search_term', ''))
 
 
 
 @app.route('/artists/<int:artist_id>')
+@response_cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
-
-    past_shows = db.session.query(Venue, Show).join(Show).join(Artist).\
-      filter(
-          Show.artist_id == artist_id,
-          Show.venue_id == Venue.id,
-          Show.start_time < datetime.now()
-      ).\
-      all()
-
-
-    upcoming_shows = db.session.query(Venue, Show).join(Show).join(Artist).\
-      filter(
-          Show.artist_id == artist_id,
-          Show.venue_id == Venue.id,
-          Show.start_time < datetime.now()
-      ).\
+    # the artist and all of its shows in one round trip, split below
+    rows = db.session.query(
+        Artist,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link')
+    ).\
+      outerjoin(Show, Show.artist_id == Artist.id).\
+      outerjoin(Venue, Show.venue_id == Venue.id).\
+      filter(Artist.id == artist_id).\
+      order_by(Show.start_time).\
       all()
+    if not rows:
+        abort(404)
 
-    artist = Artist.query.filter_by(id=artist_id).first_or_404()
-
-
-    data = {
-            'id': artist.id,
-            "name": artist.name,
-            "genres": [artist.genres],
-            "city": artist.city,
-            "state": artist.state,
-            "phone": artist.phone,
-            "website": artist.website,
-            "facebook_link": artist.facebook_link,
-            "seeking_venue": artist.seeking_venue,
-            "seeking_description": artist.seeking_description,
-            "image_link": artist.image_link,  
-            'past_shows': [{
-                'venue_id': venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-            } for venue, show in past_shows],
-            'upcoming_shows': [{
-                'venue_id': venue.id,
-                'venue_name': venue.name,
-                'venue_image_link': venue.image_link,
-                'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M")
-            } for venue, show in upcoming_shows],
-            'past_shows_count': len(past_shows),
-            'upcoming_shows_count': len(upcoming_shows)
-        }
-
+    data = serializers.ARTIST.dump(rows[0].Artist)
+    data.update(split_shows(serializers.ARTIST_SHOW.dump_rows(rows)))
     return render_template('pages/show_artist.html', artist=data)
 
 #  Update
@@ -313,25 +395,25 @@ def edit_artist_submission(artist_id):
   form = ArtistForm(obj=artist)
   print(form.seeking_venue.data)
   try:
-    artist.name=form.name.data, 
-    artist.city=form.city.data, 
-    artist.state=form.state.data, 
-    artist.phone=form.phone.data, 
-    artist.genres=form.genres.data,
-    artist.website =form.website.data, 
-    artist.seeking_venue=form.seeking_venue.data,
-    artist.seeking_description=form.seeking_description.data,
-    artist.image_link=form.image_link.data, 
+    artist.name=form.name.data
+    artist.city=form.city.data
+    artist.state=form.state.data
+    artist.phone=form.phone.data
+    artist.genres=form.genres.data
+    artist.website =form.website.data
+    artist.seeking_venue=form.seeking_venue.data
+    artist.seeking_description=form.seeking_description.data
+    artist.image_link=form.image_link.data
     artist.facebook_link=form.facebook_link.data
     
+    cache_groups = artist_cache_groups(artist_id)
     db.session.commit()
+    response_cache.invalidate(*cache_groups)
     flash('Artist ' + request.form['name'] + ' was successfully updated!')
   except ValueError:
     flash('It was not possible to edit this Artist')
     db.session.rollback()
     return None  
-  finally:
-    db.session.close()
 
   return redirect(url_for('show_artist', artist_id=artist_id))
 
@@ -353,26 +435,26 @@ def edit_venue_submission(venue_id):
 
   try:
     venue = Venue.query.filter_by(id=venue_id).first()
-    venue.name=request.form.get('name'), 
-    venue.city=request.form.get('city'), 
-    venue.state=request.form.get('state'), 
-    venue.phone=request.form.get('phone'), 
-    venue.address=request.form.get('address'), 
-    venue.genres=request.form.getlist('genres'),
-    venue.website =request.form.get('website'), 
-    venue.seeking_talent=(request.form['seeking_talent']=='y'), 
-    venue.seeking_description=request.form.get('seeking_description'),
-    venue.image_link=request.form.get('image_link'), 
+    venue.name=request.form.get('name')
+    venue.city=request.form.get('city')
+    venue.state=request.form.get('state')
+    venue.phone=request.form.get('phone')
+    venue.address=request.form.get('address')
+    venue.genres=request.form.getlist('genres')
+    venue.website =request.form.get('website')
+    venue.seeking_talent=(request.form['seeking_talent']=='y')
+    venue.seeking_description=request.form.get('seeking_description')
+    venue.image_link=request.form.get('image_link')
     venue.facebook_link=request.form.get('facebook_link')
     
+    cache_groups = venue_cache_groups(venue_id)
     db.session.commit()
+    response_cache.invalidate(*cache_groups)
     flash('Artist ' + request.form['name'] + ' was successfully updated!')
   except ValueError:
     flash('It was not possible to edit this Venue')
     db.session.rollback()
     return None  
-  finally:
-    db.session.close()
 
   return redirect(url_for('show_venue', venue_id=venue_id))
 
@@ -397,6 +479,7 @@ def create_artist_submission():
       artist.seeking_venue=(form.seeking_venue.data=='y')
       db.session.add(artist)
       db.session.commit()
+      response_cache.invalidate('artists')
       flash('Artist ' + request.form['name'] + ' was successfully listed!')
       return render_template('pages/home.html')
 
@@ -404,8 +487,6 @@ def create_artist_submission():
         print(e)
         db.session.rollback()
         flash('An error occurred. Artist could not be listed.')
-    finally:
-      db.session.close()
   else:
     message = []
     for field, err in form.errors.items():
@@ -420,15 +501,55 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
+SHOWS_PER_PAGE = 30
+
 @app.route('/shows')
+@response_cache.cached('shows')
 def shows():
-  query = Show.query.all()
-  for item in query:
-    item.artist_name = Artist.query.get(item.artist_id).name
-    item.venue_name = Venue.query.get(item.venue_id).name
-    item.artist_image_link = Artist.query.get(item.artist_id).image_link
-    item.start_time = item.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-  return render_template('pages/shows.html', shows=query)
+  after = request.args.get('after')
+  query = db.session.query(
+      Show.id,
+      Show.start_time,
+      Show.artist_id,
+      Show.venue_id,
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'),
+      Venue.name.label('venue_name')
+  ).\
+      join(Artist, Show.artist_id == Artist.id).\
+      join(Venue, Show.venue_id == Venue.id)
+
+  if after:
+    query = query.filter(db.tuple_(Show.start_time, Show.id) > parse_show_cursor(after))
+
+  rows = query.order_by(Show.start_time, Show.id).limit(SHOWS_PER_PAGE + 1).all()
+
+  next_cursor = None
+  if len(rows) > SHOWS_PER_PAGE:
+    rows = rows[:SHOWS_PER_PAGE]
+    next_cursor = show_cursor((rows[-1].start_time, rows[-1].id))
+
+  return render_template('pages/shows.html', shows=serializers.SHOW.dump_rows(rows),
+    next_cursor=next_cursor)
+
+def upcoming_feed():
+  # read from the upcoming_shows_feed materialized view, see feed.py
+  ensure_fresh(app.config['FEED_MAX_STALENESS'])
+  after = request.args.get('after')
+  rows, next_key = upcoming_page(SHOWS_PER_PAGE, parse_show_cursor(after) if after else None)
+  return serializers.FEED_SHOW.dump_rows(rows), show_cursor(next_key) if next_key else None
+
+@app.route('/upcoming')
+def upcoming_shows():
+  data, next_cursor = upcoming_feed()
+  return render_template('pages/upcoming.html', shows=data, next_cursor=next_cursor)
+
+@app.route('/upcoming.json')
+def upcoming_shows_json():
+  data, next_cursor = upcoming_feed()
+  for show in data:
+    show['start_time'] = show['start_time'].isoformat()
+  return jsonify({'data': data, 'next': next_cursor})
 
 @app.route('/shows/create')
 def create_shows():
@@ -438,28 +559,37 @@ def create_shows():
 
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
-  try:
-    form = ShowForm(request.form)
-    show = Show()
-    form.populate_obj(show)
-    show = Show(artist_id=request.form.get('artist_id'), 
-                venue_id=request.form.get('venue_id'), 
-                start_time=request.form.get('start_time'))
-
-
-    db.session.add(show)
+  outcome, = book_shows([request.form])
+  if outcome['status'] == 'created':
     db.session.commit()
+    invalidate_show_pages([request.form.get('venue_id', type=int)],
+                          [request.form.get('artist_id', type=int)])
     flash('Show was successfully listed!')
-    return render_template('pages/home.html')
-
-  except ValueError as e:
-      print(e)
-      db.session.rollback()
-      flash('An error occurred. Artist could not be listed.')
-  finally:
-    db.session.close()
+  elif outcome['status'] == 'invalid':
+    db.session.rollback()
+    flash('An error occurred. Show could not be listed.')
+  else:
+    db.session.rollback()
+    flash(outcome['error'] + ' Show could not be listed.')
   return render_template('pages/home.html')
 
+@app.route('/shows/bulk', methods=['POST'])
+def create_shows_bulk():
+  # {"shows": [{"venue_id": 1, "artist_id": 2, "start_time": "2030-01-01 20:00:00"}, ...]}
+  payload = request.get_json(silent=True) or {}
+  rows = payload.get('shows')
+  if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+    return jsonify({'error': 'expected {"shows": [{...}, ...]}'}), 400
+  if len(rows) > MAX_BATCH:
+    return jsonify({'error': 'at most {} shows per request'.format(MAX_BATCH)}), 400
+
+  outcomes = book_shows(rows)
+  db.session.commit()
+  created = [rows[outcome['index']] for outcome in outcomes if outcome['status'] == 'created']
+  invalidate_show_pages([int(row['venue_id']) for row in created],
+                        [int(row['artist_id']) for row in created])
+  return jsonify({'created': len(created), 'results': outcomes})
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -470,7 +600,7 @@ def server_error(error):
 
 
 if not app.debug:
-    file_handler = FileHandler('error.log')
+    file_handler = FileHandler(app.config['ERROR_LOG'])
     file_handler.setFormatter(
         Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
@@ -479,6 +609,14 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+if sql_profiler.enabled:
+    # one JSON object per line: request summaries and slow query plans
+    sql_handler = FileHandler(app.config['SQL_LOG'])
+    sql_handler.setFormatter(Formatter('%(asctime)s %(levelname)s %(message)s'))
+    sql_logger = logging.getLogger('fyyur.sql')
+    sql_logger.setLevel(logging.INFO)
+    sql_logger.addHandler(sql_handler)
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
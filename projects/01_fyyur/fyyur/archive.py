@@ -0,0 +1,93 @@
+"""Archival of old shows into the partitioned ``shows_archive`` table.
+
+``archive_shows`` moves shows that started before a cutoff out of
+``shows``. It runs in batches, and each batch is one statement in its own
+transaction. That statement deletes the batch, inserts it into the
+archive and takes it off the venue and artist counters, so venue and
+artist pages stop listing it. ``shows_archive`` is partitioned by
+``start_time`` with one partition per year. Partitions are created when
+first needed, and a whole year can later be detached or dropped without
+touching other rows (``flask fyyur archive-shows``).
+"""
+from datetime import datetime
+
+from models import db, Show
+
+ARCHIVE_BATCH_SIZE = 10000
+
+ARCHIVE_SQL = '''
+WITH moved AS (
+    DELETE FROM shows
+    WHERE id IN (
+        -- oldest first along ix_shows_start_time_id, so each batch reads only
+        -- the rows it moves rather than scanning and sorting the table
+        SELECT id FROM shows
+        WHERE start_time < :before
+        ORDER BY start_time, id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, artist_id, venue_id, start_time, is_upcoming
+), archived AS (
+    INSERT INTO shows_archive (id, artist_id, venue_id, start_time)
+    SELECT id, artist_id, venue_id, start_time FROM moved
+), venue_counts AS (
+    UPDATE venues
+    SET past_shows_count = venues.past_shows_count - c.past,
+        upcoming_shows_count = venues.upcoming_shows_count - c.upcoming
+    FROM (SELECT venue_id AS id,
+                 count(*) FILTER (WHERE NOT is_upcoming) AS past,
+                 count(*) FILTER (WHERE is_upcoming) AS upcoming
+          FROM moved GROUP BY venue_id) AS c
+    WHERE venues.id = c.id
+), artist_counts AS (
+    UPDATE artists
+    SET past_shows_count = artists.past_shows_count - c.past,
+        upcoming_shows_count = artists.upcoming_shows_count - c.upcoming
+    FROM (SELECT artist_id AS id,
+                 count(*) FILTER (WHERE NOT is_upcoming) AS past,
+                 count(*) FILTER (WHERE is_upcoming) AS upcoming
+          FROM moved GROUP BY artist_id) AS c
+    WHERE artists.id = c.id
+)
+SELECT count(*) FROM moved
+'''
+
+CREATE_PARTITION_SQL = '''
+CREATE TABLE IF NOT EXISTS shows_archive_y{year} PARTITION OF shows_archive
+    FOR VALUES FROM ('{year}-01-01') TO ('{next_year}-01-01')
+'''
+
+
+def ensure_partitions(before):
+    """Create the yearly partitions for every show older than ``before``."""
+    first = db.session.query(db.func.min(Show.start_time)).\
+        filter(Show.start_time < before).scalar()
+    if first is None:
+        return []
+    years = list(range(first.year, before.year + 1))
+    for year in years:
+        db.session.execute(db.text(CREATE_PARTITION_SQL.format(year=year, next_year=year + 1)))
+    db.session.commit()
+    return years
+
+
+def archive_shows(before, batch_size=ARCHIVE_BATCH_SIZE, echo=lambda moved: None):
+    """Move shows that started before ``before`` to ``shows_archive``.
+
+    Returns the number of shows moved. ``echo`` is called with the running
+    total after each committed batch.
+    """
+    if before > datetime.now():
+        raise ValueError('only shows that have already started can be archived')
+    ensure_partitions(before)
+    total = 0
+    while True:
+        moved = db.session.execute(
+            db.text(ARCHIVE_SQL), {'before': before, 'batch_size': batch_size}).scalar()
+        db.session.commit()
+        if not moved:
+            return total
+        total += moved
+        echo(total)
+
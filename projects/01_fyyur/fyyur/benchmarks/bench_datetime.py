@@ -0,0 +1,65 @@
+"""Cost of formatting show timestamps for the templates.
+
+Compares the legacy path (``strftime`` in the view, then ``dateutil`` parse
+plus ``babel.dates.format_datetime`` in the filter) with
+``formatting.format_datetime`` on ``datetime`` objects. No database is
+needed.
+
+    python benchmarks/bench_datetime.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formatting import DATETIME_FORMATS, format_datetime  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', default='full', choices=sorted(DATETIME_FORMATS))
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def legacy(values, format):
+    out = []
+    for value in values:
+        date = dateutil.parser.parse(value.strftime("%m/%d/%Y, %H:%M"))
+        out.append(babel.dates.format_datetime(date, DATETIME_FORMATS[format]))
+    return out
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    start = datetime(2020, 1, 1)
+    values = [start + timedelta(minutes=rng.randrange(10 * 365 * 24 * 60))
+              for _ in range(args.rows)]
+
+    results = {}
+    print('%-36s %10s %12s' % ('approach', 'total ms', 'us per row'))
+    for name, fn in (
+        ('legacy strftime + dateutil + babel', lambda: legacy(values, args.format)),
+        ('format_datetime per value', lambda: [format_datetime(value, args.format)
+                                               for value in values]),
+    ):
+        started = time.perf_counter()
+        results[name] = fn()
+        elapsed = time.perf_counter() - started
+        print('%-36s %10.0f %12.2f' % (name, elapsed * 1000, elapsed * 1e6 / args.rows))
+
+    outputs = list(results.values())
+    assert all(output == outputs[0] for output in outputs), 'formatters disagree'
+
+
+if __name__ == '__main__':
+    main()
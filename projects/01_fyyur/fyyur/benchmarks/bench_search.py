@@ -0,0 +1,106 @@
+"""Latency of venue name search at scale.
+
+Seeds a scratch database with generated venue names and reports p50/p99
+latency of the legacy unranked ``ilike('%term%')`` scan, the ranked
+``search.search_names`` query and the in-process ``NameIndex`` fallback.
+Pass --trigram-index to build the pg_trgm GIN index from migration
+c5e93a7b1f22 after seeding (needs the pg_trgm extension available).
+
+    python benchmarks/bench_search.py --rows 1000000 --trigram-index
+
+The target database is wiped, so never point --database-url at real data.
+"""
+import argparse
+import functools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='postgresql:///fyyur_bench')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--trigram-index', action='store_true',
+                        help='create the pg_trgm GIN index after seeding')
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url
+
+from app import app  # noqa: E402
+from models import db, Venue  # noqa: E402
+from search import NameIndex, search_names  # noqa: E402
+
+CHUNK = 10000
+WORDS = ['musical', 'hop', 'dueling', 'pianos', 'park', 'square', 'live',
+         'music', 'coffee', 'jazz', 'blue', 'note', 'hall', 'garden', 'cellar',
+         'lounge', 'theatre', 'tavern', 'social', 'club', 'factory', 'room']
+
+
+def seed(rng):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    for offset in range(0, args.rows, CHUNK):
+        db.session.execute(Venue.__table__.insert(), [{
+            'name': ' '.join(rng.choice(WORDS).title() for _ in range(3)) + ' %d' % i,
+            'city': 'City %d' % (i % 500), 'state': 'NY',
+            'address': '%d Main St' % i, 'phone': '555-0100',
+        } for i in range(offset, min(offset + CHUNK, args.rows))])
+    db.session.commit()
+    if args.trigram_index:
+        db.session.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        db.session.execute(db.text(
+            'CREATE INDEX ix_venues_name_trgm ON venues USING gin (name gin_trgm_ops)'))
+        db.session.commit()
+    db.session.execute(db.text('ANALYZE venues'))
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100.0))]
+
+
+def measure(fn, terms):
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        fn(term)
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentile(timings, 50), percentile(timings, 99)
+
+
+def legacy(term):
+    return Venue.query.filter(Venue.name.ilike("%" + term + "%")).all()
+
+
+def main():
+    rng = random.Random(args.seed)
+    with app.app_context():
+        seed(rng)
+        terms = [rng.choice(WORDS)[:rng.randint(3, 6)] + (' ' + rng.choice(WORDS) if rng.random() < 0.3 else '')
+                 for _ in range(args.queries)]
+        index = NameIndex(Venue)
+        started = time.perf_counter()
+        index.rebuild()
+        print('NameIndex build: %.0f ms' % ((time.perf_counter() - started) * 1000))
+
+        print('%-10s %-28s %10s %10s' % ('rows', 'backend', 'p50 ms', 'p99 ms'))
+        for name, fn in (
+            ('legacy ilike, unlimited', legacy),
+            ('search_names (postgres)', functools.partial(search_names, Venue)),
+            ('NameIndex (fallback)', index.search),
+        ):
+            p50, p99 = measure(fn, terms)
+            print('%-10d %-28s %10.2f %10.2f' % (args.rows, name, p50, p99))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Cost of turning query results into template/JSON dicts.
+
+Compares the hand-built dicts the views used to make with the
+``serializers`` schemas, for ``Row`` tuples (the /shows listing and the
+search results) and for ORM objects (the venue page). Times are medians
+per 10k rows. The scratch database is seeded with ``datagen``:
+
+    python benchmarks/bench_serializers.py --rows 10000
+
+The target database is wiped, so never point --database-url at real data.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='postgresql:///fyyur_bench')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=7)
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url
+os.environ['DB_STATEMENT_TIMEOUT_MS'] = '0'
+
+import datagen  # noqa: E402
+import serializers  # noqa: E402
+from app import app  # noqa: E402
+from facets import GENRE_LABELS  # noqa: E402
+from models import db, Venue, Artist, Show  # noqa: E402
+
+
+def legacy_shows(rows):
+    return [{
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'start_time': row.start_time
+    } for row in rows]
+
+
+def legacy_search(query):
+    response = []
+    for i in range(len(query)):
+        item = {}
+        item['id'] = query[i].id
+        item['name'] = query[i].name
+        item['num_upcoming_shows'] = query[i].upcoming_shows_count
+        response.append(item)
+    return response
+
+
+def legacy_venues(venues):
+    return [{
+        'id': venue.id,
+        'name': venue.name,
+        'genres': [GENRE_LABELS.get(genre, genre) for genre in venue.genres or []],
+        'city': venue.city,
+        'state': venue.state,
+        'phone': venue.phone,
+        'address': venue.address,
+        'website': venue.website,
+        'facebook_link': venue.facebook_link,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'image_link': venue.image_link,
+    } for venue in venues]
+
+
+def timed(fn):
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        datagen.load(args.rows, 1000, args.rows)
+
+        shows = db.session.query(
+            Show.id, Show.start_time, Show.artist_id, Show.venue_id,
+            Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link'),
+            Venue.name.label('venue_name')
+        ).join(Artist, Show.artist_id == Artist.id).\
+            join(Venue, Show.venue_id == Venue.id).all()
+        found = db.session.query(Venue.id, Venue.name, Venue.upcoming_shows_count).all()
+        venues = Venue.query.all()
+
+        print('%-42s %12s %12s' % ('approach', 'ms per 10k', 'speedup'))
+        for label, legacy, schema in (
+            ('/shows rows', lambda: legacy_shows(shows),
+             lambda: serializers.SHOW.dump_rows(shows)),
+            ('search rows, range(len()) loop', lambda: legacy_search(found),
+             lambda: serializers.SEARCH_RESULT.dump_rows(found)),
+            ('venue ORM objects', lambda: legacy_venues(venues),
+             lambda: serializers.VENUE.dump_all(venues)),
+        ):
+            before, after = timed(legacy), timed(schema)
+            scale = 10000.0 / args.rows * 1000
+            print('%-42s %12.2f' % (label + ': hand-built', before * scale))
+            print('%-42s %12.2f %11.1fx' % (label + ': schema', after * scale, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Plans and latency of the venue/artist detail pages with and without
+the shows indexes from migrations e4a7d2c9b813 and 7b3e91d5a0c6.
+
+Seeds a scratch database with generated shows (server-side, with
+generate_series), drops the shows indexes and measures /venues/<id> and
+/artists/<id>. It then recreates the indexes and measures again. For each
+page it prints the plan node used on ``shows`` and the median latency.
+
+    python benchmarks/bench_show_indexes.py --shows 5000000
+
+The target database is wiped, so never point --database-url at real data.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='postgresql:///fyyur_bench')
+    parser.add_argument('--shows', type=int, default=5000000)
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url
+# seeding millions of rows outlasts the app's default statement timeout
+os.environ['DB_STATEMENT_TIMEOUT_MS'] = '0'
+
+from sqlalchemy import UniqueConstraint, event  # noqa: E402
+from sqlalchemy.schema import AddConstraint, DropConstraint  # noqa: E402
+
+from app import app, response_cache  # noqa: E402
+from models import db, Show  # noqa: E402
+
+SEED_SQL = '''
+INSERT INTO venues (id, name, city, state, address, phone, genres)
+SELECT i, 'Venue ' || i, 'City ' || i % 50, 'NY', i || ' Main St', '555-0100', '{Jazz}'
+FROM generate_series(1, :venues) AS i;
+INSERT INTO artists (id, name, city, state, phone, genres, image_link)
+SELECT i, 'Artist ' || i, 'City ' || i % 50, 'NY', '555-0100', '{Jazz}',
+       'https://example.com/' || i || '.jpg'
+FROM generate_series(1, :artists) AS i;
+INSERT INTO shows (artist_id, venue_id, start_time, is_upcoming)
+SELECT i % :artists + 1, i % :venues + 1,
+       timestamp '2020-01-01' + i * interval '1 minute',
+       timestamp '2020-01-01' + i * interval '1 minute' > now()
+FROM generate_series(0, :shows - 1) AS i;
+'''
+
+
+def unique_constraints():
+    return [constraint for constraint in Show.__table__.constraints
+            if isinstance(constraint, UniqueConstraint)]
+
+
+def seed():
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    for index in Show.__table__.indexes:
+        index.drop(db.engine)
+    with db.engine.begin() as conn:
+        for constraint in unique_constraints():
+            conn.execute(DropConstraint(constraint))
+    params = {'venues': args.venues, 'artists': args.artists, 'shows': args.shows}
+    for statement in SEED_SQL.strip().split(';\n'):
+        db.session.execute(db.text(statement), params)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+
+def shows_scan(plan):
+    """The plan lines that read the shows table."""
+    return '; '.join(line.strip().lstrip('-> ') for line in plan
+                     if ' on shows' in line or '_shows_' in line)
+
+
+def measure(client, path, ids):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    timings = []
+    for id in ids:
+        started = time.perf_counter()
+        res = client.get(path.format(id))
+        timings.append(time.perf_counter() - started)
+        assert res.status_code == 200, res.status_code
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        client.get(path.format(ids[0]))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    statement, parameters = statements[-1]
+    with db.engine.connect() as conn:
+        plan = [row[0] for row in conn.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+    return shows_scan(plan), statistics.median(timings) * 1000
+
+
+def main():
+    rng = random.Random(args.seed)
+    response_cache.enabled = False
+    client = app.test_client()
+    with app.app_context():
+        started = time.perf_counter()
+        seed()
+        print('seeded %d shows in %.0f s' % (args.shows, time.perf_counter() - started))
+        venue_ids = [rng.randint(1, args.venues) for _ in range(args.requests)]
+        artist_ids = [rng.randint(1, args.artists) for _ in range(args.requests)]
+
+        results = {}
+        for indexed in (False, True):
+            if indexed:
+                started = time.perf_counter()
+                for index in Show.__table__.indexes:
+                    index.create(db.engine)
+                with db.engine.begin() as conn:
+                    for constraint in unique_constraints():
+                        conn.execute(AddConstraint(constraint))
+                    conn.exec_driver_sql('ANALYZE shows')
+                print('built shows indexes in %.0f s' % (time.perf_counter() - started))
+            for page, path, ids in (('show_venue', '/venues/{}', venue_ids),
+                                    ('show_artist', '/artists/{}', artist_ids)):
+                results[page, indexed] = measure(client, path, ids)
+
+        print('%-12s %-8s %12s  %s' % ('page', 'indexes', 'median ms', 'shows plan'))
+        for (page, indexed), (scan, ms) in sorted(results.items()):
+            print('%-12s %-8s %12.2f  %s' % (page, 'yes' if indexed else 'no', ms, scan))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Compare the legacy N+1 /shows loop with the joined, keyset-paged view.
+
+Seeds a scratch database with the requested number of shows and reports
+the number of SQL statements and the median latency of each approach.
+
+    python benchmarks/bench_shows.py --shows 10000 1000000
+
+The target database is wiped, so never point --database-url at real data.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='postgresql:///fyyur_bench')
+    parser.add_argument('--shows', type=int, nargs='+', default=[10000, 1000000])
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help='skip the legacy loop above this many shows')
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url
+
+from sqlalchemy import event  # noqa: E402
+
+from app import app, response_cache  # noqa: E402
+from models import db, Venue, Artist, Show  # noqa: E402
+
+CHUNK = 10000
+
+
+def seed(n_shows):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Venue.__table__.insert(), [{
+        'id': i, 'name': 'Venue %d' % i, 'city': 'City %d' % (i % 50),
+        'state': 'NY', 'address': '%d Main St' % i, 'phone': '555-0100',
+        'genres': ['Jazz'],
+    } for i in range(1, args.venues + 1)])
+    db.session.execute(Artist.__table__.insert(), [{
+        'id': i, 'name': 'Artist %d' % i, 'city': 'City %d' % (i % 50),
+        'state': 'NY', 'phone': '555-0100', 'genres': ['Jazz'],
+        'image_link': 'https://example.com/%d.jpg' % i,
+    } for i in range(1, args.artists + 1)])
+    start = datetime(2020, 1, 1)
+    for offset in range(0, n_shows, CHUNK):
+        db.session.execute(Show.__table__.insert(), [{
+            'artist_id': i % args.artists + 1,
+            'venue_id': i % args.venues + 1,
+            'start_time': start + timedelta(hours=i),
+        } for i in range(offset, min(offset + CHUNK, n_shows))])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+
+
+def legacy_shows():
+    query = Show.query.all()
+    for item in query:
+        item.artist_name = Artist.query.get(item.artist_id).name
+        item.venue_name = Venue.query.get(item.venue_id).name
+        item.artist_image_link = Artist.query.get(item.artist_id).image_link
+        item.start_time = item.start_time.strftime("%m/%d/%Y, %H:%M:%S")
+    db.session.rollback()
+    return query
+
+
+def measure(fn, repeat):
+    statements = []
+
+    def count(*_):
+        statements.append(1)
+
+    timings = []
+    queries = 0
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        for _ in range(repeat):
+            del statements[:]
+            db.session.expunge_all()
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+            queries = len(statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return queries, statistics.median(timings) * 1000
+
+
+def main():
+    response_cache.enabled = False
+    client = app.test_client()
+    print('%-10s %-24s %10s %12s' % ('shows', 'approach', 'queries', 'median ms'))
+    with app.app_context():
+        for n_shows in args.shows:
+            seed(n_shows)
+            middle = db.session.query(Show).order_by(Show.start_time, Show.id).\
+                offset(n_shows // 2).first()
+            cursor = '{},{}'.format(middle.start_time.isoformat(), middle.id)
+            cases = [
+                ('joined, first page', lambda: client.get('/shows')),
+                ('joined, middle page', lambda: client.get('/shows', query_string={'after': cursor})),
+            ]
+            if n_shows <= args.legacy_max:
+                cases.insert(0, ('legacy N+1, all rows', legacy_shows))
+            for name, fn in cases:
+                queries, ms = measure(fn, args.repeat if 'legacy' not in name else 1)
+                print('%-10d %-24s %10d %12.2f' % (n_shows, name, queries, ms))
+
+
+if __name__ == '__main__':
+    main()
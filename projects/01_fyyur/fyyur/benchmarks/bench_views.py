@@ -0,0 +1,90 @@
+"""Per-view micro-benchmarks through the Flask test client (pytest-benchmark).
+
+A scratch database is seeded once per session with ``datagen`` at the
+scale given by ``BENCH_VENUES``, ``BENCH_ARTISTS``, ``BENCH_SHOWS`` and
+``BENCH_SEED``. The response cache is off, so every round renders the
+view, body included for streamed views. The number of SQL statements
+one request ran is stored in the benchmark's ``extra_info``.
+
+    python -m pytest benchmarks/bench_views.py --benchmark-json=views.json \\
+        --benchmark-save-data
+    python benchmarks/report.py views.json --baseline benchmarks/baseline.json
+
+The target database is wiped, so never point DATABASE_URL at real data.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'postgresql:///fyyur_bench')
+os.environ['SQL_PROFILER'] = '0'
+os.environ['DB_STATEMENT_TIMEOUT_MS'] = '0'
+
+import datagen  # noqa: E402
+from app import app, response_cache  # noqa: E402
+from models import db  # noqa: E402
+
+SCALE = {
+    'venues': int(os.environ.get('BENCH_VENUES', 500)),
+    'artists': int(os.environ.get('BENCH_ARTISTS', 1000)),
+    'shows': int(os.environ.get('BENCH_SHOWS', 50000)),
+    'seed': int(os.environ.get('BENCH_SEED', 1)),
+}
+
+VIEWS = [
+    ('index', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('venues_by_genre', 'GET', '/venues?genre=Jazz', None),
+    ('show_venue', 'GET', '/venues/1', None),
+    ('search_venues', 'POST', '/venues/search', {'search_term': 'hall'}),
+    ('artists', 'GET', '/artists', None),
+    ('show_artist', 'GET', '/artists/1', None),
+    ('search_artists', 'POST', '/artists/search', {'search_term': 'echo'}),
+    ('shows', 'GET', '/shows', None),
+    ('upcoming', 'GET', '/upcoming', None),
+    ('upcoming_json', 'GET', '/upcoming.json', None),
+]
+
+
+@pytest.fixture(scope='session')
+def client():
+    response_cache.enabled = False
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        datagen.load(SCALE['venues'], SCALE['artists'], SCALE['shows'], seed=SCALE['seed'])
+        db.session.remove()
+        yield app.test_client()
+
+
+@pytest.fixture
+def statements(client):
+    counter = {'count': 0}
+
+    def count(*args):
+        counter['count'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', count)
+
+
+@pytest.mark.parametrize('name, method, path, data', VIEWS, ids=[view[0] for view in VIEWS])
+def test_view(benchmark, client, statements, name, method, path, data):
+    benchmark.group = 'views'
+    benchmark.extra_info.update(path=path, scale=SCALE)
+
+    def request():
+        statements['count'] = 0
+        response = client.open(path, method=method, data=data)
+        response.get_data()  # render streamed bodies inside the timing
+        response.close()  # as a WSGI server would; releases a streamed view's session
+        return response
+
+    response = benchmark(request)
+    assert response.status_code == 200
+    benchmark.extra_info['queries'] = statements['count']
@@ -0,0 +1,97 @@
+"""Load test: sync Flask pages against the async /api/v1 routes.
+
+Start both servers against the same database, with the response cache
+off so the sync side does real work, then point this script at them:
+
+    CACHE_ENABLED=false gunicorn -w 2 --threads 4 -b 127.0.0.1:5000 app:app
+    uvicorn api:asgi_app --port 5001
+    python benchmarks/load_api.py --concurrency 64 --requests 2000
+
+Each pair of routes gets the same number of requests at the same
+concurrency. The script reports throughput and p50/p95/p99 latency. The
+client is a dependency-free asyncio HTTP/1.1 client that opens one
+connection per request.
+"""
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+PAIRS = [
+    ('artist detail', '/artists/{id}', '/api/v1/artists/{id}'),
+    ('venues list', '/venues', '/api/v1/venues'),
+    ('shows list', '/shows', '/api/v1/shows'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sync-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--async-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--max-id', type=int, default=1000,
+                        help='artist ids are drawn from 1..max-id')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+async def get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write('GET {} HTTP/1.1\r\nHost: {}\r\nConnection: close\r\n\r\n'.format(
+            path, host).encode('latin-1'))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run(base_url, paths, concurrency):
+    url = urlsplit(base_url)
+    pending = iter(paths)
+    timings = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for path in pending:
+            started = time.perf_counter()
+            try:
+                status = await get(url.hostname, url.port, path)
+            except OSError:
+                status = None
+            timings.append(time.perf_counter() - started)
+            if status not in (200, 404):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, sorted(timings), errors
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100.0))] * 1000
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    ids = [rng.randint(1, args.max_id) for _ in range(args.requests)]
+    print('%-14s %-6s %9s %9s %9s %9s %7s' % (
+        'route', 'stack', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for name, sync_path, async_path in PAIRS:
+        for stack, base_url, path in (('sync', args.sync_url, sync_path),
+                                      ('async', args.async_url, async_path)):
+            paths = [path.format(id=id) for id in ids]
+            elapsed, timings, errors = asyncio.run(run(base_url, paths, args.concurrency))
+            print('%-14s %-6s %9.0f %9.1f %9.1f %9.1f %7d' % (
+                name, stack, len(paths) / elapsed, percentile(timings, 50),
+                percentile(timings, 95), percentile(timings, 99), errors))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""HTTP load profile for a running Fyyur server (Locust).
+
+Users browse the way the site is used: mostly listings and detail pages,
+some searches and the upcoming feed. Ids are drawn from the ranges
+``datagen`` seeded (``BENCH_VENUES``/``BENCH_ARTISTS``), so seed the
+server's database with the same scale first:
+
+    flask fyyur seed --reset --venues 500 --artists 1000 --shows 50000
+    SQL_PROFILER=1 gunicorn -w 4 app:app
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 \\
+        --headless -u 50 -r 10 -t 1m --csv load
+    python benchmarks/report.py --locust load --baseline benchmarks/baseline.json
+
+When the server runs with ``SQL_PROFILER=1``, the query count of every
+response is read from its ``Server-Timing`` header and the mean per
+request name is written to ``<csv prefix>_queries.json`` for the report.
+Cache hits count as zero queries, and streamed pages (``/artists``) only
+count the queries run before their header was sent.
+"""
+import json
+import os
+import random
+import re
+from collections import defaultdict
+
+from locust import HttpUser, between, events, task
+
+VENUES = int(os.environ.get('BENCH_VENUES', 500))
+ARTISTS = int(os.environ.get('BENCH_ARTISTS', 1000))
+SEARCH_TERMS = ['hall', 'echo', 'blue', 'club', 'neon', 'park']
+GENRES = ['Jazz', 'Blues', 'Folk', 'Rock_n_Roll', 'Hip_Hop']
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+query_counts = defaultdict(list)
+
+
+@events.request.add_listener
+def record_queries(name, response, exception, **kwargs):
+    if exception or response is None:
+        return
+    match = QUERIES.search(response.headers.get('Server-Timing', ''))
+    if match:
+        query_counts[name].append(int(match.group(1)))
+
+
+@events.test_stop.add_listener
+def write_queries(environment, **kwargs):
+    prefix = environment.parsed_options and environment.parsed_options.csv_prefix
+    if not prefix or not query_counts:
+        return
+    with open(prefix + '_queries.json', 'w') as handle:
+        json.dump({name: sum(counts) / len(counts) for name, counts in query_counts.items()},
+                  handle, indent=2, sort_keys=True)
+
+
+class Visitor(HttpUser):
+    wait_time = between(0.5, 2)
+
+    @task(3)
+    def index(self):
+        self.client.get('/', name='index')
+
+    @task(4)
+    def venues(self):
+        self.client.get('/venues', name='venues')
+
+    @task(2)
+    def venues_by_genre(self):
+        self.client.get('/venues', params={'genre': random.choice(GENRES)},
+                        name='venues_by_genre')
+
+    @task(6)
+    def show_venue(self):
+        self.client.get('/venues/{}'.format(random.randint(1, VENUES)), name='show_venue')
+
+    @task(4)
+    def artists(self):
+        self.client.get('/artists', name='artists')
+
+    @task(6)
+    def show_artist(self):
+        self.client.get('/artists/{}'.format(random.randint(1, ARTISTS)), name='show_artist')
+
+    @task(2)
+    def search(self):
+        kind = random.choice(['venues', 'artists'])
+        self.client.post('/{}/search'.format(kind),
+                         data={'search_term': random.choice(SEARCH_TERMS)},
+                         name='search_' + kind)
+
+    @task(3)
+    def shows(self):
+        self.client.get('/shows', name='shows')
+
+    @task(3)
+    def upcoming(self):
+        self.client.get('/upcoming', name='upcoming')
@@ -0,0 +1,137 @@
+"""Latency and query-count report for the view benchmarks and load runs.
+
+Reads pytest-benchmark JSON (``bench_views.py`` run with
+``--benchmark-json=... --benchmark-save-data``) and/or a Locust CSV run
+(``--locust PREFIX``). Prints p50/p95/p99 latency in milliseconds and
+SQL queries per request for each view.
+
+With ``--baseline``, it also works as a regression gate. It exits non-zero
+if a view's gated percentile is more than ``--tolerance`` slower than the
+baseline, if the view runs more queries per request, or if the baseline
+has no entry for the view. Write a new baseline with ``--output``:
+
+    python benchmarks/report.py views.json --output benchmarks/baseline.json
+    python benchmarks/report.py views.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('results', nargs='*', help='pytest-benchmark JSON files')
+    parser.add_argument('--locust', metavar='PREFIX', help='Locust --csv prefix')
+    parser.add_argument('--output', help='write the report as JSON')
+    parser.add_argument('--baseline', help='report JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed latency regression, as a fraction')
+    parser.add_argument('--gate', choices=['p50', 'p95', 'p99'], default='p95',
+                        help='percentile the gate compares')
+    args = parser.parse_args()
+    if not args.results and not args.locust:
+        parser.error('give pytest-benchmark JSON files and/or --locust')
+    return args
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of ``values``."""
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+def from_pytest_benchmark(path):
+    with open(path) as handle:
+        results = json.load(handle)
+    report = {}
+    for bench in results['benchmarks']:
+        data = bench['stats'].get('data')
+        if not data:
+            sys.exit('{}: no raw timings; rerun with --benchmark-save-data'.format(path))
+        entry = {'p{}'.format(p): percentile(data, p) * 1000 for p in PERCENTILES}
+        entry.update(requests=len(data), queries=bench['extra_info'].get('queries'))
+        report[bench.get('param') or bench['name']] = entry
+    return report
+
+
+def from_locust(prefix):
+    queries = {}
+    if os.path.exists(prefix + '_queries.json'):
+        with open(prefix + '_queries.json') as handle:
+            queries = json.load(handle)
+    report = {}
+    with open(prefix + '_stats.csv') as handle:
+        for row in csv.DictReader(handle):
+            if row['Name'] == 'Aggregated' or not int(row['Request Count']):
+                continue
+            entry = {'p{}'.format(p): float(row['{}%'.format(p)]) for p in PERCENTILES}
+            entry.update(requests=int(row['Request Count']),
+                         failures=int(row['Failure Count']),
+                         queries=queries.get(row['Name']))
+            report['load:' + row['Name']] = entry
+    return report
+
+
+def print_report(report):
+    print('{:<28} {:>9} {:>9} {:>9} {:>8} {:>8}'.format(
+        'view', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'requests'))
+    for name in sorted(report):
+        entry = report[name]
+        queries = entry['queries']
+        print('{:<28} {:>9.2f} {:>9.2f} {:>9.2f} {:>8} {:>8}'.format(
+            name, entry['p50'], entry['p95'], entry['p99'],
+            '-' if queries is None else '{:.3g}'.format(queries), entry['requests']))
+
+
+def regressions(report, baseline, tolerance, gate):
+    """Describe every view that got slower, runs more queries or has no baseline."""
+    failures = []
+    for name, entry in sorted(report.items()):
+        base = baseline.get(name)
+        if base is None:
+            failures.append('{}: no baseline; write one with --output'.format(name))
+            continue
+        if entry[gate] > base[gate] * (1 + tolerance):
+            failures.append('{}: {} {:.2f} ms, baseline {:.2f} ms (+{:.0%})'.format(
+                name, gate, entry[gate], base[gate], entry[gate] / base[gate] - 1))
+        if None not in (entry['queries'], base.get('queries')) and \
+                entry['queries'] > base['queries']:
+            failures.append('{}: {:g} queries per request, baseline {:g}'.format(
+                name, entry['queries'], base['queries']))
+        if entry.get('failures'):
+            failures.append('{}: {} failed requests'.format(name, entry['failures']))
+    return failures
+
+
+def main():
+    args = parse_args()
+    report = {}
+    for path in args.results:
+        report.update(from_pytest_benchmark(path))
+    if args.locust:
+        report.update(from_locust(args.locust))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        failures = regressions(report, baseline, args.tolerance, args.gate)
+        for failure in failures:
+            print('REGRESSION ' + failure)
+        if failures:
+            sys.exit(1)
+        print('No regressions against {} ({} within {:.0%}).'.format(
+            args.baseline, args.gate, args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Transactional show booking with double-booking detection.
+
+``book_shows`` validates many show rows, inserts the valid ones in the
+caller's transaction and returns an outcome per row:
+
+- ``created``: inserted; ``id`` is the new show id;
+- ``conflict``: the venue already has a show at that start time;
+- ``unknown``: the venue or artist does not exist;
+- ``invalid``: the row failed ``ShowForm`` validation; see ``errors``.
+
+Double bookings are caught by the ``uq_shows_venue_id_start_time``
+constraint, not by reading shows first, so two concurrent batches cannot
+both book the same slot. On PostgreSQL the whole batch is one
+``INSERT ... ON CONFLICT DO NOTHING`` statement. Other databases try each
+row under its own SAVEPOINT.
+"""
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from counters import count_bulk_shows
+from importer import ShowRowValidator
+from models import db, Show
+
+MAX_BATCH = 1000
+
+BOOK_SQL = '''
+WITH input AS (
+    SELECT * FROM unnest(CAST(:ords AS integer[]), CAST(:venue_ids AS integer[]),
+                         CAST(:artist_ids AS integer[]), CAST(:start_times AS timestamp[]),
+                         CAST(:upcoming AS boolean[]))
+        AS r(ord, venue_id, artist_id, start_time, is_upcoming)
+), checked AS (
+    SELECT input.*, venues.id IS NOT NULL AND artists.id IS NOT NULL AS known
+    FROM input
+    LEFT JOIN venues ON venues.id = input.venue_id
+    LEFT JOIN artists ON artists.id = input.artist_id
+), inserted AS (
+    INSERT INTO shows (venue_id, artist_id, start_time, is_upcoming)
+    SELECT venue_id, artist_id, start_time, is_upcoming FROM checked
+    WHERE known
+    ORDER BY ord
+    ON CONFLICT (venue_id, start_time) DO NOTHING
+    RETURNING id, venue_id, start_time
+)
+SELECT checked.ord, checked.known, inserted.id
+FROM checked
+LEFT JOIN inserted ON inserted.venue_id = checked.venue_id
+    AND inserted.start_time = checked.start_time
+ORDER BY checked.ord
+'''
+
+
+def _insert_batch(rows):
+    """Yield ``(values, known, id)`` for each row, ``id`` None if not inserted."""
+    if not rows:
+        return
+    if db.session.get_bind().dialect.name == 'postgresql':
+        result = db.session.execute(db.text(BOOK_SQL), {
+            'ords': list(range(len(rows))),
+            'venue_ids': [row['venue_id'] for row in rows],
+            'artist_ids': [row['artist_id'] for row in rows],
+            'start_times': [row['start_time'] for row in rows],
+            'upcoming': [row['is_upcoming'] for row in rows],
+        })
+        for ord, known, id in result:
+            yield rows[ord], known, id
+        return
+
+    table = Show.__table__
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                id = db.session.execute(table.insert().values(**row)).inserted_primary_key[0]
+        except IntegrityError:
+            id = None
+        yield row, True, id
+
+
+def book_shows(rows, now=None):
+    """Book ``rows`` (mappings with venue_id, artist_id and start_time).
+
+    Returns one outcome dict per input row, in order. Created shows are
+    added to the venue/artist counters; committing is left to the caller.
+    """
+    if len(rows) > MAX_BATCH:
+        raise ValueError('at most {} shows per batch'.format(MAX_BATCH))
+    validator = ShowRowValidator(check_references=False)
+    validator.now = now or datetime.now()
+    outcomes = []
+    valid = []
+    for index, row in enumerate(rows):
+        values, errors = validator.validate(row)
+        if errors:
+            outcomes.append({'index': index, 'status': 'invalid', 'errors': errors})
+        else:
+            outcomes.append({'index': index})
+            valid.append(values)
+
+    created = []
+    taken = set()
+    pending = (outcome for outcome in outcomes if 'status' not in outcome)
+    for outcome, (values, known, id) in zip(pending, _insert_batch(valid)):
+        # a batch that repeats a slot gets one row back for both copies
+        if known and id is not None and id not in taken:
+            taken.add(id)
+            outcome.update(status='created', id=id)
+            created.append(values)
+        elif not known:
+            outcome.update(status='unknown', error='No such venue or artist.')
+        else:
+            outcome.update(status='conflict',
+                           error='The venue is already booked at that time.')
+    if created:
+        count_bulk_shows(created)
+    return outcomes
@@ -0,0 +1,160 @@
+"""Rendered-page cache for the Fyyur read views.
+
+Each cached view belongs to a group such as ``'venues'`` or
+``'venue:{venue_id}'``. Entries are keyed by the group's current
+generation plus the request path and query string, so ``invalidate``
+only has to bump a generation counter to drop every page of a group.
+Responses carry an ETag and answer ``If-None-Match`` with 304. A streamed
+response is passed through chunk by chunk and only cached once the whole
+body has been sent.
+
+Backends are an in-process LRU with TTL (default) or any Redis-compatible
+server when ``CACHE_BACKEND = 'redis'`` (requires the ``redis`` package).
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, make_response
+
+
+class LRUCache(object):
+    """Thread-safe in-process LRU cache whose entries expire after ``ttl``."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, group):
+        return self._generations.get(group, 0)
+
+    def bump(self, group):
+        with self._lock:
+            self._generations[group] = self._generations.get(group, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisCache(object):
+    """Same interface as LRUCache, stored in a Redis-compatible server."""
+
+    def __init__(self, url, ttl=300, prefix='fyyur:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value):
+        self._client.setex(self.prefix + key, self.ttl, pickle.dumps(value))
+
+    def generation(self, group):
+        return int(self._client.get(self.prefix + 'gen:' + group) or 0)
+
+    def bump(self, group):
+        self._client.incr(self.prefix + 'gen:' + group)
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class ResponseCache(object):
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        ttl = app.config.get('CACHE_TTL', 300)
+        if app.config.get('CACHE_BACKEND', 'lru') == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'], ttl=ttl)
+        else:
+            self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl=ttl)
+        self.enabled = app.config.get('CACHE_ENABLED', True)
+        app.extensions['response_cache'] = self
+
+    def cached(self, group):
+        """Cache a GET view under ``group``, formatted with the view kwargs."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # pages rendered with pending flash messages are per-user
+                if not self.enabled or session.get('_flashes'):
+                    return view(**kwargs)
+
+                name = group.format(**kwargs)
+                key = '{}:{}:{}'.format(name, self.backend.generation(name), request.full_path)
+                entry = self.backend.get(key)
+                if entry is None:
+                    response = make_response(view(**kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if response.is_streamed:
+                        response.response = self._tee(key, response.response, response.mimetype)
+                        return response
+                    body = response.get_data()
+                    entry = (body, response.mimetype, hashlib.md5(body).hexdigest())
+                    self.backend.set(key, entry)
+                else:
+                    response = make_response(entry[0])
+                    response.mimetype = entry[1]
+                response.set_etag(entry[2])
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    def _tee(self, key, chunks, mimetype):
+        """Yield ``chunks`` and cache their concatenation once they run out."""
+        body = []
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                body.append(chunk)
+                yield chunk
+        finally:
+            # closed early (e.g. the client went away): nothing is cached
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        body = b''.join(body)
+        self.backend.set(key, (body, mimetype, hashlib.md5(body).hexdigest()))
+
+    def invalidate(self, *groups):
+        for group in groups:
+            self.backend.bump(group)
+
+    def clear(self):
+        self.backend.clear()
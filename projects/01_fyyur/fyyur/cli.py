@@ -0,0 +1,122 @@
+"""``flask fyyur ...`` maintenance commands."""
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+import datagen
+from archive import ARCHIVE_BATCH_SIZE, archive_shows
+from counters import roll_upcoming_shows, reconcile_show_counts
+from facets import rebuild_venue_facets
+from feed import refresh_feed
+from importer import IMPORTS, DEFAULT_BATCH_SIZE, import_file
+from models import Venue, Artist, Show
+
+fyyur_cli = AppGroup('fyyur', help='Fyyur maintenance commands.')
+
+
+@fyyur_cli.command('roll-shows')
+def roll_shows_command():
+    """Move shows that have started from upcoming to past counters."""
+    rolled = roll_upcoming_shows()
+    click.echo('Rolled {} show(s) into the past.'.format(rolled))
+
+
+@fyyur_cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Recompute every venue and artist show counter in bulk."""
+    venues, artists = reconcile_show_counts()
+    click.echo('Corrected {} venue(s) and {} artist(s).'.format(venues, artists))
+
+
+@fyyur_cli.command('rebuild-facets')
+def rebuild_facets_command():
+    """Recompute the venue genre/state facet counts."""
+    rows = rebuild_venue_facets()
+    if 'response_cache' in current_app.extensions:
+        current_app.extensions['response_cache'].invalidate('venues')
+    click.echo('Rebuilt {} facet row(s).'.format(rows))
+
+
+@fyyur_cli.command('refresh-feed')
+@click.option('--loop', is_flag=True,
+              help='Keep refreshing every FEED_REFRESH_INTERVAL seconds.')
+def refresh_feed_command(loop):
+    """Refresh the upcoming-shows feed (materialized view)."""
+    while True:
+        started = time.monotonic()
+        rows = refresh_feed()
+        click.echo('Refreshed upcoming-shows feed: {} show(s) in {:.2f}s.'.format(
+            rows, time.monotonic() - started))
+        if not loop:
+            return
+        time.sleep(max(0, current_app.config['FEED_REFRESH_INTERVAL'] -
+                       (time.monotonic() - started)))
+
+
+@fyyur_cli.command('archive-shows')
+@click.option('--older-than', default=365, show_default=True,
+              help='Archive shows that started more than this many days ago.')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True,
+              help='Shows moved per transaction.')
+def archive_shows_command(older_than, batch_size):
+    """Move old shows into the partitioned shows_archive table."""
+    started = time.monotonic()
+    moved = archive_shows(datetime.now() - timedelta(days=older_than), batch_size=batch_size,
+                          echo=lambda total: click.echo('{} show(s) archived'.format(total)))
+    if moved and 'response_cache' in current_app.extensions:
+        current_app.extensions['response_cache'].clear()
+    click.echo('Archived {} show(s) in {:.1f}s.'.format(moved, time.monotonic() - started))
+
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True,
+              help='Rows validated and written per transaction.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format, taken from the file extension by default.')
+@click.option('--restart', is_flag=True, help='Ignore an existing checkpoint.')
+def import_command(kind, path, batch_size, fmt, restart):
+    """Bulk-load KIND (venues, artists or shows) from a CSV or NDJSON file."""
+    stats = import_file(kind, path, batch_size=batch_size, fmt=fmt,
+                        restart=restart, echo=click.echo)
+    if 'response_cache' in current_app.extensions:
+        current_app.extensions['response_cache'].clear()
+    click.echo('Imported {imported} of {read} rows ({rejected} rejected) '
+               'in {seconds:.1f}s.'.format(**stats))
+
+
+@fyyur_cli.command('seed')
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=1000, show_default=True)
+@click.option('--shows', default=100000, show_default=True)
+@click.option('--seed', default=1, show_default=True, help='Same seed, same data.')
+@click.option('--anchor', type=click.DateTime(['%Y-%m-%d']),
+              help='Shows are spread around this date; today by default.')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+              help='Processes copying shows in parallel.')
+@click.option('--batch-size', default=datagen.BATCH_SIZE, show_default=True,
+              help='Rows copied per transaction.')
+@click.option('--reset', is_flag=True, help='Empty the tables first.')
+def seed_command(venues, artists, shows, seed, anchor, workers, batch_size, reset):
+    """Fill the database with generated venues, artists and shows."""
+    # checked before anything is written: every show needs a venue and an artist
+    if shows > 0 and (venues <= 0 or artists <= 0):
+        raise click.BadParameter('shows need at least one venue and one artist.',
+                                 param_hint="'--shows'")
+    if reset:
+        datagen.reset()
+    elif any(model.query.first() for model in (Venue, Artist, Show)):
+        raise click.ClickException('The database is not empty; pass --reset to replace it.')
+    started = time.monotonic()
+    datagen.load(venues, artists, shows, seed=seed, anchor=anchor, workers=workers,
+                 batch_size=batch_size,
+                 echo=lambda message: click.echo('Copied {} ({:.1f}s).'.format(
+                     message, time.monotonic() - started)))
+    if 'response_cache' in current_app.extensions:
+        current_app.extensions['response_cache'].clear()
+    click.echo('Seeded in {:.1f}s.'.format(time.monotonic() - started))
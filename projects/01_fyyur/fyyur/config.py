@@ -10,5 +10,40 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql:///fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql:///fyyur')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+# Connection pool, per worker process. Keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below PostgreSQL max_connections.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    'connect_args': {
+        'options': '-c statement_timeout={}'.format(DB_STATEMENT_TIMEOUT_MS),
+    },
+}
+
+# Log files, relative to the working directory
+ERROR_LOG = os.environ.get('ERROR_LOG', 'error.log')
+
+# Rendered-page cache, see cache.py
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')  # 'lru' or 'redis'
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+
+# Per-request SQL profiler, see profiler.py
+SQL_PROFILER = os.environ.get('SQL_PROFILER', '').lower() in ('1', 'true')
+SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+SQL_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('SQL_PROFILER_REPEAT_THRESHOLD', 5))
+SQL_LOG = os.environ.get('SQL_LOG', 'sql.log')
+
+# Upcoming-shows feed, see feed.py
+FEED_REFRESH_INTERVAL = int(os.environ.get('FEED_REFRESH_INTERVAL', 60))
+FEED_MAX_STALENESS = int(os.environ.get('FEED_MAX_STALENESS', 300))
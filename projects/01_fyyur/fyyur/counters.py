@@ -0,0 +1,198 @@
+"""Materialized past/upcoming show counters on Venue and Artist.
+
+Every Show carries an ``is_upcoming`` flag that records which counter it
+was added to. ORM inserts and deletes keep the counters current through
+mapper events; ``roll_upcoming_shows`` moves shows that have since
+started from the upcoming to the past counters and is meant to be run
+periodically (``flask fyyur roll-shows``). Bulk writes that bypass the
+ORM events are repaired by ``reconcile_show_counts``. Shows deleted by
+``ON DELETE CASCADE`` along with their venue or artist are taken off the
+other side's counters when the ORM deletes that venue or artist.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+import dateutil.parser
+from sqlalchemy import bindparam, event
+
+from models import db, Venue, Artist, Show
+
+
+def _is_upcoming(start_time, now=None):
+    if isinstance(start_time, str):
+        start_time = dateutil.parser.parse(start_time)
+    return start_time > (now or datetime.now())
+
+
+def _bump(connection, show, column, delta):
+    for model, key in ((Venue, show.venue_id), (Artist, show.artist_id)):
+        table = model.__table__
+        connection.execute(
+            table.update().
+            where(table.c.id == key).
+            values({column: table.c[column] + delta})
+        )
+
+
+def _counter_for(show):
+    return 'upcoming_shows_count' if show.is_upcoming else 'past_shows_count'
+
+
+@event.listens_for(Show, 'before_insert')
+def _mark_upcoming(mapper, connection, show):
+    show.is_upcoming = _is_upcoming(show.start_time)
+
+
+@event.listens_for(Show, 'after_insert')
+def _count_inserted_show(mapper, connection, show):
+    _bump(connection, show, _counter_for(show), 1)
+
+
+@event.listens_for(Show, 'after_delete')
+def _count_deleted_show(mapper, connection, show):
+    _bump(connection, show, _counter_for(show), -1)
+
+
+# shows removed by ON DELETE CASCADE never reach the ORM events above;
+# take them off the other side's counters before the parent row goes
+UNCOUNT_CASCADED_SQL = '''
+UPDATE {table}
+SET past_shows_count = {table}.past_shows_count - c.past,
+    upcoming_shows_count = {table}.upcoming_shows_count - c.upcoming
+FROM (
+    SELECT {fk} AS id,
+           count(*) FILTER (WHERE NOT is_upcoming) AS past,
+           count(*) FILTER (WHERE is_upcoming) AS upcoming
+    FROM shows
+    WHERE {parent_fk} = :parent_id
+    GROUP BY {fk}
+) AS c
+WHERE {table}.id = c.id
+'''
+
+
+@event.listens_for(Venue, 'before_delete')
+def _uncount_venue_shows(mapper, connection, venue):
+    connection.execute(db.text(UNCOUNT_CASCADED_SQL.format(
+        table='artists', fk='artist_id', parent_fk='venue_id')), {'parent_id': venue.id})
+
+
+@event.listens_for(Artist, 'before_delete')
+def _uncount_artist_shows(mapper, connection, artist):
+    connection.execute(db.text(UNCOUNT_CASCADED_SQL.format(
+        table='venues', fk='venue_id', parent_fk='artist_id')), {'parent_id': artist.id})
+
+
+BULK_COUNT_SQL = '''
+UPDATE {table}
+SET past_shows_count = past_shows_count + c.past,
+    upcoming_shows_count = upcoming_shows_count + c.upcoming
+FROM unnest(CAST(:keys AS integer[]), CAST(:past AS integer[]), CAST(:upcoming AS integer[]))
+    AS c(id, past, upcoming)
+WHERE {table}.id = c.id
+'''
+
+
+def count_bulk_shows(rows):
+    """Add shows written outside the ORM (e.g. COPY) to the counters.
+
+    ``rows`` are mappings with ``venue_id``, ``artist_id`` and
+    ``is_upcoming``; the updates join the caller's transaction.
+    """
+    postgres = db.session.get_bind().dialect.name == 'postgresql'
+    for model, key in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+        counts = defaultdict(lambda: [0, 0])
+        for row in rows:
+            counts[row[key]][row['is_upcoming']] += 1
+        if not counts:
+            continue
+        table = model.__table__
+        if postgres:
+            # one statement per table instead of one per venue/artist
+            keys = list(counts)
+            db.session.execute(db.text(BULK_COUNT_SQL.format(table=table.name)), {
+                'keys': keys,
+                'past': [counts[key_id][0] for key_id in keys],
+                'upcoming': [counts[key_id][1] for key_id in keys],
+            })
+            continue
+        db.session.execute(
+            table.update().
+            where(table.c.id == bindparam('key')).
+            values(
+                past_shows_count=table.c.past_shows_count + bindparam('past'),
+                upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming')
+            ),
+            [{'key': key_id, 'past': past, 'upcoming': upcoming}
+             for key_id, (past, upcoming) in counts.items()]
+        )
+
+
+ROLL_SQL = '''
+WITH rolled AS (
+    UPDATE shows SET is_upcoming = false
+    WHERE is_upcoming AND start_time <= :now
+    RETURNING venue_id, artist_id
+), venue_counts AS (
+    UPDATE venues
+    SET upcoming_shows_count = upcoming_shows_count - r.n,
+        past_shows_count = past_shows_count + r.n
+    FROM (SELECT venue_id, count(*) AS n FROM rolled GROUP BY venue_id) r
+    WHERE venues.id = r.venue_id
+), artist_counts AS (
+    UPDATE artists
+    SET upcoming_shows_count = upcoming_shows_count - r.n,
+        past_shows_count = past_shows_count + r.n
+    FROM (SELECT artist_id, count(*) AS n FROM rolled GROUP BY artist_id) r
+    WHERE artists.id = r.artist_id
+)
+SELECT count(*) FROM rolled
+'''
+
+RECONCILE_SHOWS_SQL = '''
+UPDATE shows SET is_upcoming = (start_time > :now)
+WHERE is_upcoming IS DISTINCT FROM (start_time > :now)
+'''
+
+RECONCILE_COUNTS_SQL = '''
+UPDATE {table}
+SET upcoming_shows_count = coalesce(c.upcoming, 0),
+    past_shows_count = coalesce(c.past, 0)
+FROM {table} t
+LEFT JOIN (
+    SELECT {fk},
+           count(*) FILTER (WHERE is_upcoming) AS upcoming,
+           count(*) FILTER (WHERE NOT is_upcoming) AS past
+    FROM shows GROUP BY {fk}
+) c ON c.{fk} = t.id
+WHERE {table}.id = t.id
+  AND ({table}.upcoming_shows_count, {table}.past_shows_count)
+      IS DISTINCT FROM (coalesce(c.upcoming, 0), coalesce(c.past, 0))
+'''
+
+
+def roll_upcoming_shows(now=None):
+    """Move shows that have started into the past counters.
+
+    Runs as a single statement and returns the number of shows rolled.
+    """
+    rolled = db.session.execute(
+        db.text(ROLL_SQL), {'now': now or datetime.now()}).scalar()
+    db.session.commit()
+    return rolled
+
+
+def reconcile_show_counts(now=None):
+    """Recompute every venue and artist counter from the shows table.
+
+    Returns the number of (venues, artists) rows that were corrected.
+    """
+    params = {'now': now or datetime.now()}
+    db.session.execute(db.text(RECONCILE_SHOWS_SQL), params)
+    fixed = tuple(
+        db.session.execute(db.text(RECONCILE_COUNTS_SQL.format(
+            table=table, fk=fk))).rowcount
+        for table, fk in (('venues', 'venue_id'), ('artists', 'artist_id'))
+    )
+    db.session.commit()
+    return fixed
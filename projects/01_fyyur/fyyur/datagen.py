@@ -0,0 +1,215 @@
+"""Deterministic sample data for benchmarks, scale tests and development.
+
+``venues``, ``artists`` and ``shows`` yield table rows, using only values
+the forms accept (``state_choices``, ``genres_choices``). The same seed,
+counts and anchor always give the same rows. Each generator draws from its
+own ``random.Random``, seeded from ``seed`` (an int) and the table name.
+Each show's draws are a hash of the seed and its index, so any range of
+shows can be generated alone, in any process.
+
+Ids are explicit, 1..n, so shows can reference venues and artists without
+a lookup. Shows sit on distinct days per venue, half before and half
+after ``anchor``, which keeps ``uq_shows_venue_id_start_time`` satisfied.
+
+``load`` streams the generators straight into ``COPY``; no ORM objects are
+built. Shows are split into ranges, one per worker process. Derived tables
+(counters, facets, the upcoming feed) are rebuilt at the end
+(``flask fyyur seed``).
+"""
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from counters import reconcile_show_counts
+from facets import rebuild_venue_facets
+from feed import refresh_feed
+from forms import state_choices, genres_choices
+from importer import copy_rows
+from models import app, db, Venue, Artist, Show
+
+STATES = [value for value, label in state_choices]
+GENRES = [value for value, label in genres_choices]
+NAME_WORDS = ['Musical', 'Hop', 'Dueling', 'Pianos', 'Park', 'Square', 'Live',
+              'Blue', 'Note', 'Hall', 'Garden', 'Cellar', 'Lounge', 'Theatre',
+              'Tavern', 'Social', 'Club', 'Factory', 'Room', 'Velvet', 'Echo',
+              'Neon', 'Copper', 'Harbor', 'Midnight', 'Golden', 'Sparrow']
+CITY_WORDS = ['Spring', 'River', 'Oak', 'Cedar', 'Lake', 'Mill', 'Fair',
+              'Green', 'Stone', 'Maple', 'Pine', 'Bridge']
+CITY_SUFFIXES = ['field', 'ton', 'view', 'port', 'dale', ' City', ' Falls']
+BATCH_SIZE = 100000
+TABLES = ('venues', 'artists', 'shows')
+MASK64 = (1 << 64) - 1
+
+
+def _mix(value):
+    """splitmix64: 64 well-mixed bits from an int, far cheaper than a new Random."""
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+def _rng(seed, table):
+    return random.Random('{}:{}'.format(seed, table))
+
+
+def _phone(rng):
+    return '{:03d}-{:03d}-{:04d}'.format(rng.randrange(200, 1000), rng.randrange(1000),
+                                         rng.randrange(10000))
+
+
+def _place(rng):
+    return (rng.choice(CITY_WORDS) + rng.choice(CITY_SUFFIXES), rng.choice(STATES))
+
+
+def venues(count, seed=1):
+    rng = _rng(seed, 'venues')
+    for id in range(1, count + 1):
+        city, state = _place(rng)
+        yield {
+            'id': id,
+            'name': 'The {} {} {}'.format(rng.choice(NAME_WORDS), rng.choice(NAME_WORDS), id),
+            'city': city,
+            'state': state,
+            'address': '{} {} Street'.format(rng.randrange(1, 2000), rng.choice(NAME_WORDS)),
+            'phone': _phone(rng),
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'website': 'https://venue{}.example.com'.format(id),
+            'seeking_talent': rng.random() < 0.5,
+            'seeking_description': None,
+            'image_link': 'https://images.example.com/venues/{}.jpg'.format(id),
+            'facebook_link': 'https://www.facebook.com/venue{}'.format(id),
+        }
+
+
+def artists(count, seed=1):
+    rng = _rng(seed, 'artists')
+    for id in range(1, count + 1):
+        city, state = _place(rng)
+        yield {
+            'id': id,
+            'name': '{} {} {}'.format(rng.choice(NAME_WORDS), rng.choice(NAME_WORDS), id),
+            'city': city,
+            'state': state,
+            'phone': _phone(rng),
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'website': 'https://artist{}.example.com'.format(id),
+            'seeking_venue': rng.random() < 0.5,
+            'seeking_description': None,
+            'image_link': 'https://images.example.com/artists/{}.jpg'.format(id),
+            'facebook_link': 'https://www.facebook.com/artist{}'.format(id),
+        }
+
+
+def today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def shows(count, venue_count, artist_count, seed=1, anchor=None, now=None,
+          start=0, stop=None):
+    """Shows ``start`` .. ``stop - 1`` of a set of ``count``."""
+    anchor = anchor or today()
+    now = now or datetime.now()
+    days = -(-count // venue_count)
+    for index in range(start, count if stop is None else stop):
+        # the same show always gets the same draws, whatever range it is in
+        bits = _mix((seed << 40) + index)
+        day, venue = divmod(index, venue_count)
+        start_time = anchor + timedelta(days=day - days // 2,
+                                        hours=17 + (bits >> 32) % 6,
+                                        minutes=30 * (bits >> 63))
+        yield {
+            'id': index + 1,
+            'venue_id': venue + 1,
+            'artist_id': bits % artist_count + 1,
+            'start_time': start_time,
+            'is_upcoming': start_time > now,
+        }
+
+
+def copy_in_batches(model, rows, batch_size=BATCH_SIZE):
+    """``COPY`` ``rows`` into ``model``'s table, one transaction per batch."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    columns = list(first)
+    rows = itertools.chain([first], rows)
+    total = 0
+    while True:
+        written = copy_rows(model.__table__, columns, itertools.islice(rows, batch_size))
+        db.session.commit()
+        if not written:
+            return total
+        total += written
+
+
+def split(count, parts):
+    """``(start, stop)`` ranges covering ``count`` items in ``parts`` pieces."""
+    size = -(-count // max(1, parts)) if count else 0
+    return [(start, min(start + size, count)) for start in range(0, count, size or 1)]
+
+
+def _start_worker():
+    # connections inherited from the parent process must not be reused
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def _copy_show_range(job):
+    start, stop, options = job
+    batch_size = options.pop('batch_size')
+    with app.app_context():
+        written = copy_in_batches(Show, shows(start=start, stop=stop, **options), batch_size)
+        db.session.remove()
+        return written
+
+
+def reset():
+    """Empty the seeded tables and everything derived from them."""
+    db.session.execute(db.text('TRUNCATE {} RESTART IDENTITY CASCADE'.format(
+        ', '.join(TABLES + ('venue_genre_counts',)))))
+    db.session.commit()
+
+
+def reset_sequences():
+    """Point each id sequence past the explicit ids that were written."""
+    for table in TABLES:
+        db.session.execute(db.text(
+            "SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+            "coalesce(max(id), 0) + 1, false) FROM {0}".format(table)))
+    db.session.commit()
+
+
+def rebuild_derived(now=None):
+    """Recompute show counters, venue facets and the upcoming feed."""
+    reconcile_show_counts(now)
+    rebuild_venue_facets()
+    refresh_feed()
+
+
+def load(venue_count, artist_count, show_count, seed=1, anchor=None, now=None,
+         batch_size=BATCH_SIZE, workers=1, echo=lambda message: None):
+    """Write a generated data set into empty tables and rebuild derived data.
+
+    Shows are copied by ``workers`` processes, each over its own id range;
+    every worker commits ``batch_size`` rows at a time.
+    """
+    anchor = anchor or today()
+    now = now or datetime.now()
+    echo('{} venues'.format(copy_in_batches(Venue, venues(venue_count, seed), batch_size)))
+    echo('{} artists'.format(copy_in_batches(Artist, artists(artist_count, seed), batch_size)))
+
+    options = {'count': show_count, 'venue_count': venue_count, 'artist_count': artist_count,
+               'seed': seed, 'anchor': anchor, 'now': now, 'batch_size': batch_size}
+    jobs = [(start, stop, dict(options)) for start, stop in split(show_count, workers)]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(len(jobs), initializer=_start_worker) as pool:
+            written = sum(pool.map(_copy_show_range, jobs))
+    else:
+        written = sum(map(_copy_show_range, jobs))
+    echo('{} shows'.format(written))
+
+    reset_sequences()
+    rebuild_derived(now)
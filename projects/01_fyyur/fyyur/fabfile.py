@@ -7,12 +7,23 @@ from fabric.contrib.console import confirm
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python test_app.py -v", capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def bench():
+    with settings(warn_only=True):
+        result = local(
+            "python -m pytest benchmarks/bench_views.py -q "
+            "--benchmark-json=views.json --benchmark-save-data && "
+            "python benchmarks/report.py views.json --baseline benchmarks/baseline.json"
+        )
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -40,7 +51,7 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python test_app.py -v"
     )
 
 
@@ -0,0 +1,136 @@
+"""Genre and state facets for the venue listing.
+
+``venue_genre_counts`` holds the number of venues per (genre, state).
+Genre ``''`` counts every venue in a state, so state totals need no scan
+either. ORM inserts, updates and deletes of a venue adjust only the rows
+for its old and new genres/state, through mapper events in the same
+transaction. Writes that bypass the ORM (``flask fyyur import``) call
+``count_bulk_venues``, and ``rebuild_venue_facets`` recomputes everything
+(``flask fyyur rebuild-facets``).
+
+Filtering venues by genre uses ``genres @> ARRAY[...]`` on the GIN index
+``ix_venues_genres``.
+"""
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import get_history
+
+from forms import genres_choices
+from models import db, Venue, VenueGenreCount
+
+ALL_GENRES = ''
+GENRE_LABELS = dict(genres_choices)
+GENRE_KEYS = {label: key for key, label in genres_choices}
+
+REBUILD_SQL = '''
+INSERT INTO venue_genre_counts (genre, state, count)
+SELECT genre, state, count(*) FROM (
+    SELECT DISTINCT id, state, unnest(genres) AS genre FROM venues
+    UNION ALL
+    SELECT id, state, '' FROM venues
+) AS venue_genres
+GROUP BY genre, state
+'''
+
+
+def genre_key(genre):
+    """The stored key for a genre given by key or label ('R_B' or 'R&B')."""
+    return GENRE_KEYS.get(genre, genre)
+
+
+def _facet_keys(genres, state):
+    return [(genre, state) for genre in set(genres or ())] + [(ALL_GENRES, state)]
+
+
+def _apply(connection, deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    table = VenueGenreCount.__table__
+    statement = dialect.insert(table)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.genre, table.c.state],
+            set_={'count': table.c.count + statement.excluded.count}
+        ),
+        [{'genre': genre, 'state': state, 'count': delta}
+         for (genre, state), delta in deltas.items()]
+    )
+
+
+def _old_value(venue, name):
+    history = get_history(venue, name)
+    if history.deleted:
+        return history.deleted[0]
+    return (history.unchanged or [None])[0]
+
+
+def _noop(target, value, oldvalue, initiator):
+    pass
+
+
+# load the previous genres/state when they are assigned, so the update
+# listener can take the venue out of its old facets
+for _attribute in (Venue.genres, Venue.state):
+    event.listen(_attribute, 'set', _noop, active_history=True)
+
+
+@event.listens_for(Venue, 'after_insert')
+def _count_inserted_venue(mapper, connection, venue):
+    _apply(connection, Counter(_facet_keys(venue.genres, venue.state)))
+
+
+@event.listens_for(Venue, 'after_update')
+def _count_updated_venue(mapper, connection, venue):
+    genres, state = get_history(venue, 'genres'), get_history(venue, 'state')
+    if not (genres.has_changes() or state.has_changes()):
+        return
+    deltas = Counter(_facet_keys(venue.genres, venue.state))
+    deltas.subtract(_facet_keys(_old_value(venue, 'genres'), _old_value(venue, 'state')))
+    _apply(connection, deltas)
+
+
+@event.listens_for(Venue, 'before_delete')
+def _count_deleted_venue(mapper, connection, venue):
+    deltas = Counter()
+    deltas.subtract(_facet_keys(venue.genres, venue.state))
+    _apply(connection, deltas)
+
+
+def count_bulk_venues(rows):
+    """Add venues written outside the ORM (e.g. COPY) to the facets."""
+    deltas = Counter()
+    for row in rows:
+        deltas.update(_facet_keys(row.get('genres'), row['state']))
+    _apply(db.session.connection(), deltas)
+
+
+def rebuild_venue_facets():
+    """Recompute ``venue_genre_counts`` from the venues table."""
+    db.session.execute(VenueGenreCount.__table__.delete())
+    db.session.execute(db.text(REBUILD_SQL))
+    db.session.commit()
+    return db.session.query(VenueGenreCount).count()
+
+
+def venue_facets(genre=None, state=None):
+    """Venue counts by genre (within ``state``) and by state (within ``genre``).
+
+    Returns ``(genres, states)``, each a list of ``(key, count)`` pairs,
+    largest first; genres carry their display label as a third element.
+    """
+    by_genre = db.session.query(VenueGenreCount.genre, db.func.sum(VenueGenreCount.count)).\
+        filter(VenueGenreCount.genre != ALL_GENRES, VenueGenreCount.count > 0)
+    if state:
+        by_genre = by_genre.filter(VenueGenreCount.state == state)
+    by_state = db.session.query(VenueGenreCount.state, VenueGenreCount.count).\
+        filter(VenueGenreCount.genre == (genre or ALL_GENRES), VenueGenreCount.count > 0)
+
+    genres = [(key, int(count), GENRE_LABELS.get(key, key)) for key, count in
+              by_genre.group_by(VenueGenreCount.genre).all()]
+    genres.sort(key=lambda item: (-item[1], item[2]))
+    states = sorted(by_state.all(), key=lambda item: (-item[1], item[0]))
+    return genres, states
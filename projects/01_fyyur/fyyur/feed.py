@@ -0,0 +1,116 @@
+"""Upcoming-shows feed backed by a PostgreSQL materialized view.
+
+``upcoming_shows_feed`` holds every show that had not started at the last
+refresh, already joined to its venue and artist. The time of that refresh
+is kept in the one-row ``feed_refresh`` table, so an empty view still has
+an age. Pages read it with a keyset cursor on the unique
+``(start_time, id)`` index. Rows whose show has started since the refresh
+are filtered out at read time.
+
+Freshness is handled two ways:
+
+- ``flask fyyur refresh-feed --loop`` refreshes it every
+  ``FEED_REFRESH_INTERVAL`` seconds;
+- ``FEED_MAX_STALENESS`` is a bound checked on read: a read that finds the
+  view older than that refreshes it first.
+
+Refreshes are ``CONCURRENTLY``, so readers are never blocked. An advisory
+lock keeps simultaneous stale reads from refreshing more than once.
+"""
+from datetime import datetime
+
+from sqlalchemy import DDL, MetaData, Table, Column, Integer, String, DateTime, event, tuple_
+
+from models import db, FeedRefresh
+
+FEED_VIEW = 'upcoming_shows_feed'
+REFRESH_LOCK = 0x66656564  # pg advisory lock key, 'feed'
+
+CREATE_VIEW_SQL = '''
+CREATE MATERIALIZED VIEW upcoming_shows_feed AS
+SELECT shows.id, shows.start_time,
+       venues.id AS venue_id, venues.name AS venue_name,
+       venues.city AS venue_city, venues.state AS venue_state,
+       artists.id AS artist_id, artists.name AS artist_name,
+       artists.image_link AS artist_image_link
+FROM shows
+JOIN venues ON venues.id = shows.venue_id
+JOIN artists ON artists.id = shows.artist_id
+WHERE shows.start_time > localtimestamp
+'''
+# unique, as REFRESH ... CONCURRENTLY requires; also the keyset index
+CREATE_INDEX_SQL = '''
+CREATE UNIQUE INDEX ix_upcoming_shows_feed_start_time_id
+    ON upcoming_shows_feed (start_time, id)
+'''
+DROP_VIEW_SQL = 'DROP MATERIALIZED VIEW IF EXISTS upcoming_shows_feed'
+# now() is the start of the refreshing transaction, as seen by the view
+RECORD_REFRESH_SQL = '''
+INSERT INTO feed_refresh (id, refreshed_at) VALUES (1, now())
+ON CONFLICT (id) DO UPDATE SET refreshed_at = excluded.refreshed_at
+'''
+
+# create_all/drop_all (tests, benchmarks) manage the view with the tables
+for _sql in (CREATE_VIEW_SQL, CREATE_INDEX_SQL):
+    event.listen(db.metadata, 'after_create', DDL(_sql).execute_if(dialect='postgresql'))
+event.listen(db.metadata, 'before_drop', DDL(DROP_VIEW_SQL).execute_if(dialect='postgresql'))
+
+# the view's columns, for building queries; not part of db.metadata
+feed = Table(
+    FEED_VIEW, MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('start_time', DateTime),
+    Column('venue_id', Integer),
+    Column('venue_name', String),
+    Column('venue_city', String),
+    Column('venue_state', String),
+    Column('artist_id', Integer),
+    Column('artist_name', String),
+    Column('artist_image_link', String),
+)
+
+
+def refresh_feed():
+    """Refresh the view without blocking readers; returns the row count."""
+    db.session.execute(db.text('REFRESH MATERIALIZED VIEW CONCURRENTLY ' + FEED_VIEW))
+    db.session.execute(db.text(RECORD_REFRESH_SQL))
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(feed).scalar()
+
+
+def feed_age():
+    """Seconds since the last refresh, or None if none was recorded."""
+    return db.session.query(
+        db.func.extract('epoch', db.func.now() - FeedRefresh.refreshed_at)).scalar()
+
+
+def ensure_fresh(max_staleness):
+    """Refresh the view if it is older than ``max_staleness`` seconds.
+
+    A view with no recorded refresh counts as stale. If another request
+    is already refreshing, the current contents are served rather than
+    waiting.
+    """
+    age = feed_age()
+    if age is not None and age <= max_staleness:
+        return
+    locked = db.session.execute(
+        db.text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': REFRESH_LOCK}).scalar()
+    if locked:
+        refresh_feed()
+
+
+def upcoming_page(limit, after=None, now=None):
+    """One page of upcoming shows after the ``(start_time, id)`` key ``after``.
+
+    Returns ``(rows, next_key)``; ``next_key`` is None on the last page.
+    """
+    query = db.session.query(feed).\
+        filter(feed.c.start_time > (now or datetime.now()))
+    if after is not None:
+        query = query.filter(tuple_(feed.c.start_time, feed.c.id) > after)
+    rows = query.order_by(feed.c.start_time, feed.c.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1].start_time, rows[-1].id)
+    return rows, None
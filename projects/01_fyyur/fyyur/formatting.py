@@ -0,0 +1,38 @@
+"""Date/time formatting for the templates.
+
+``format_datetime`` takes ``datetime`` objects as they come from the
+database. Strings still work but take the slower ``dateutil`` parse. Babel
+patterns are parsed once per (format, locale) and reused, so a page of
+shows costs one pattern lookup per row rather than a pattern parse.
+"""
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+DEFAULT_LOCALE = babel.dates.LC_TIME or 'en_US'
+
+
+@lru_cache(maxsize=128)
+def compiled_pattern(format, locale):
+    """The parsed Babel pattern and ``Locale`` for a format name or pattern."""
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse(locale)
+
+
+def _apply(pattern, locale, value):
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    if value.tzinfo is None:
+        # what babel.dates.format_datetime assumes for naive values
+        value = value.replace(tzinfo=babel.dates.UTC)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium', locale=DEFAULT_LOCALE):
+    pattern, locale = compiled_pattern(format, locale)
+    return _apply(pattern, locale, value)
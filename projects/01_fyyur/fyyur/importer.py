@@ -0,0 +1,372 @@
+"""Bulk import of venues, artists and shows from CSV or NDJSON files.
+
+Rows are validated against the rules of the existing ``VenueForm``,
+``ArtistForm`` and ``ShowForm``. The form classes are compiled once into
+plain per-field checks, so no form object is built per row. Valid rows
+are written one batch per transaction, with ``COPY`` on PostgreSQL and
+``executemany`` elsewhere. Shows that would double-book a venue are
+skipped by ``uq_shows_venue_id_start_time`` and rejected, rather than
+failing their batch.
+
+After every committed batch, ``<file>.checkpoint`` records how many input
+rows have been consumed. A rerun resumes from there. Rejected rows and
+their errors are appended to ``<file>.rejects.ndjson``.
+"""
+import csv
+import inspect
+import io
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+
+from sqlalchemy import table as table_clause
+from sqlalchemy.exc import IntegrityError
+from wtforms.fields import DateTimeField, RadioField, SelectMultipleField
+from wtforms.fields.core import UnboundField
+from wtforms.validators import DataRequired, Regexp, URL
+
+from counters import count_bulk_shows
+from facets import count_bulk_venues
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show
+
+DEFAULT_BATCH_SIZE = 5000
+ISO_FORMAT = '%Y-%m-%d %H:%M:%S'
+# the range of the integer id columns
+MIN_ID, MAX_ID = -2 ** 31, 2 ** 31 - 1
+SHOW_CONFLICT = ('venue_id', 'start_time')
+SHOW_CONFLICT_ERROR = 'The venue is already booked at that time.'
+
+# rows clashing on a unique constraint are COPYed into a staging table and
+# moved over with ON CONFLICT DO NOTHING; ord keeps the first of a batch's
+# duplicates, and RETURNING tells which rows went in
+STAGE_SQL = '''
+CREATE TEMPORARY TABLE {stage} AS SELECT {columns} FROM {table} WITH NO DATA
+'''
+
+UNSTAGE_SQL = '''
+INSERT INTO {table} ({columns})
+SELECT {columns} FROM {stage} ORDER BY ord
+ON CONFLICT ({conflict}) DO NOTHING
+RETURNING {conflict}
+'''
+
+
+class CompiledField(object):
+    """One form field's conversion and validation rules."""
+
+    def __init__(self, name, unbound):
+        field_class = unbound.field_class
+        kwargs = unbound.kwargs
+        validators = kwargs.get('validators') or []
+        for validator in validators:
+            if not isinstance(validator, (DataRequired, Regexp)):
+                raise ValueError('{}: cannot compile validator {!r}'.format(name, validator))
+
+        self.name = name
+        self.required = any(isinstance(v, DataRequired) for v in validators)
+        # (regex, hostname check) pairs; hostnames repeat a lot across rows,
+        # so URL's costly ipaddress/idna hostname check is memoized
+        self.patterns = [
+            (v.regex, lru_cache(maxsize=65536)(v.validate_hostname) if isinstance(v, URL) else None)
+            for v in validators if isinstance(v, Regexp)
+        ]
+        self.choices = {value for value, label in kwargs['choices']} if kwargs.get('choices') else None
+        self.default = kwargs.get('default')
+        self.multiple = issubclass(field_class, SelectMultipleField)
+        self.radio = issubclass(field_class, RadioField)
+        self.formats = None
+        if issubclass(field_class, DateTimeField):
+            formats = kwargs.get('format', ISO_FORMAT)
+            self.formats = [formats] if isinstance(formats, str) else formats
+
+    def convert(self, raw):
+        """Return ``(value, error)`` for a raw CSV/JSON value."""
+        if self.multiple:
+            if isinstance(raw, str):
+                raw = [item for item in raw.split(';') if item]
+            value = [str(item) for item in raw or []]
+            if self.required and not value:
+                return None, 'This field is required.'
+            if self.choices is not None and not set(value) <= self.choices:
+                return None, 'Invalid choice.'
+            return value, None
+
+        if raw is None or raw == '':
+            raw = self.default if self.radio else raw
+        value = '' if raw is None else str(raw).strip()
+        if self.required and not value:
+            return None, 'This field is required.'
+        for regex, validate_hostname in self.patterns:
+            match = regex.match(value)
+            if not match:
+                return None, 'Invalid URL.' if validate_hostname else 'Invalid input.'
+            if validate_hostname and not validate_hostname(match.group('host')):
+                return None, 'Invalid URL.'
+        if self.choices is not None and value not in self.choices:
+            return None, 'Not a valid choice.'
+        if self.formats:
+            if self.formats[0] == ISO_FORMAT and len(value) == 19 and value[10] == ' ':
+                # the default format, parsed without strptime's per-call regex work
+                try:
+                    return datetime.fromisoformat(value), None
+                except ValueError:
+                    pass
+            for date_format in self.formats:
+                try:
+                    return datetime.strptime(value, date_format), None
+                except ValueError:
+                    pass
+            return None, 'Not a valid datetime value.'
+        if self.radio:
+            return value == 'y', None
+        return value, None
+
+
+class RowValidator(object):
+    """A WTForms form class compiled into per-row checks."""
+
+    now = None
+
+    def __init__(self, form_class, columns):
+        unbound = [(name, field) for name, field in inspect.getmembers(form_class)
+                   if isinstance(field, UnboundField)]
+        unbound.sort(key=lambda item: item[1].creation_counter)
+        self.fields = [CompiledField(name, field) for name, field in unbound
+                       if name in columns]
+
+    def validate(self, row):
+        values = {}
+        errors = {}
+        for field in self.fields:
+            value, error = field.convert(row.get(field.name))
+            if error:
+                errors[field.name] = error
+            else:
+                values[field.name] = value
+        return values, errors
+
+
+class ShowRowValidator(RowValidator):
+    """ShowForm rules plus integer ids, within the range of the id columns.
+
+    With ``check_references`` the ids must also name existing rows; all
+    venue and artist ids are loaded once, on the first row.
+    """
+
+    def __init__(self, check_references=True):
+        super(ShowRowValidator, self).__init__(ShowForm, Show.__table__.c)
+        self.check_references = check_references
+        self._venue_ids = None
+        self._artist_ids = None
+
+    def validate(self, row):
+        values, errors = super(ShowRowValidator, self).validate(row)
+        if self.check_references and self._venue_ids is None:
+            self._venue_ids = {id for id, in db.session.query(Venue.id)}
+            self._artist_ids = {id for id, in db.session.query(Artist.id)}
+        for name, known in (('venue_id', self._venue_ids), ('artist_id', self._artist_ids)):
+            try:
+                values[name] = int(values.get(name) or '')
+            except ValueError:
+                errors[name] = 'Not a valid integer.'
+                continue
+            if not MIN_ID <= values[name] <= MAX_ID:
+                errors[name] = 'Number must be between {} and {}.'.format(MIN_ID, MAX_ID)
+                continue
+            if self.check_references and values[name] not in known:
+                errors[name] = 'No such {}.'.format(name[:-3])
+        if not errors:
+            values['is_upcoming'] = values['start_time'] > self.now
+        return values, errors
+
+
+IMPORTS = {
+    'venues': (Venue, lambda: RowValidator(VenueForm, Venue.__table__.c)),
+    'artists': (Artist, lambda: RowValidator(ArtistForm, Artist.__table__.c)),
+    'shows': (Show, ShowRowValidator),
+}
+
+
+def read_rows(path, fmt=None):
+    """Stream dicts from a ``.csv`` or ``.ndjson``/``.jsonl`` file."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            for row in csv.DictReader(handle):
+                yield row
+        elif fmt in ('ndjson', 'jsonl', 'json'):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError('Unsupported import format: {}'.format(fmt))
+
+
+def _copy_text(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, list):
+        value = '{' + ','.join(
+            '"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value) + '}'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').\
+        replace('\n', '\\n').replace('\r', '\\r')
+
+
+def write_batch(table, columns, rows, conflict=None):
+    """Insert ``rows`` into ``table`` inside the current session transaction.
+
+    Rows that clash on the ``conflict`` columns with an existing row, or
+    with an earlier row of the batch, are skipped. Returns the set of their
+    positions in ``rows``.
+    """
+    connection = db.session.connection()
+    if not conflict:
+        if connection.dialect.name != 'postgresql':
+            connection.execute(table.insert(), rows)
+        else:
+            copy_rows(table, columns, rows)
+        return set()
+
+    skipped = set()
+    if connection.dialect.name != 'postgresql':
+        for index, row in enumerate(rows):
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert(), row)
+            except IntegrityError:
+                skipped.add(index)
+        return skipped
+
+    names = {'table': table.name, 'stage': table.name + '_import',
+             'columns': ', '.join(columns), 'conflict': ', '.join(conflict)}
+    db.session.execute(db.text(STAGE_SQL.format(**names)))
+    db.session.execute(db.text('ALTER TABLE {stage} ADD COLUMN ord serial'.format(**names)))
+    copy_rows(table_clause(names['stage']), columns, rows)
+    inserted = {tuple(key) for key in db.session.execute(db.text(UNSTAGE_SQL.format(**names)))}
+    db.session.execute(db.text('DROP TABLE {stage}'.format(**names)))
+    for index, row in enumerate(rows):
+        key = tuple(row[column] for column in conflict)
+        if key in inserted:
+            inserted.remove(key)
+        else:
+            skipped.add(index)
+    return skipped
+
+
+def copy_rows(table, columns, rows):
+    """``COPY`` ``rows``, any iterable of mappings, into ``table`` (PostgreSQL).
+
+    With psycopg 3 the rows are streamed as they are produced, so a
+    generator is never held in memory. Returns the number of rows written.
+    """
+    lines = ('\t'.join(_copy_text(row.get(column)) for column in columns) + '\n'
+             for row in rows)
+    sql = 'COPY {} ({}) FROM STDIN'.format(table.name, ', '.join(columns))
+    count = 0
+    cursor = db.session.connection().connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            lines = list(lines)
+            count = len(lines)
+            cursor.copy_expert(sql, io.StringIO(''.join(lines)))
+        else:
+            with cursor.copy(sql) as copy:
+                for line in lines:
+                    copy.write(line)
+                    count += 1
+    finally:
+        cursor.close()
+    return count
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)['rows']
+    except (IOError, ValueError, KeyError):
+        return 0
+
+
+def _write_checkpoint(path, rows):
+    with open(path + '.tmp', 'w') as handle:
+        json.dump({'rows': rows}, handle)
+    os.replace(path + '.tmp', path)
+
+
+def import_file(kind, path, batch_size=DEFAULT_BATCH_SIZE, fmt=None,
+                restart=False, echo=print):
+    """Import ``path`` into the ``kind`` table; returns a stats dict."""
+    model, make_validator = IMPORTS[kind]
+    validator = make_validator()
+    table = model.__table__
+    checkpoint = path + '.checkpoint'
+    rejects_path = path + '.rejects.ndjson'
+    skip = 0 if restart else _read_checkpoint(checkpoint)
+    if skip:
+        echo('Resuming {} after {} rows'.format(path, skip))
+
+    rows = itertools.islice(read_rows(path, fmt), skip, None)
+    conflict = SHOW_CONFLICT if model is Show else None
+    stats = {'read': skip, 'imported': 0, 'rejected': 0}
+    started = time.perf_counter()
+    with open(rejects_path, 'w' if restart or not skip else 'a') as rejects:
+        try:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                validator.now = datetime.now()
+                accepted = []
+                numbers = []
+                # written once the batch is committed, so a failed batch that
+                # a rerun retries does not leave its rejects in the file twice
+                batch_rejects = []
+                for offset, row in enumerate(batch):
+                    values, errors = validator.validate(row)
+                    if errors:
+                        batch_rejects.append({'row': stats['read'] + offset + 1,
+                                              'errors': errors})
+                    else:
+                        accepted.append(values)
+                        numbers.append(stats['read'] + offset + 1)
+                if accepted:
+                    columns = [column for column in accepted[0] if column in table.c]
+                    skipped = write_batch(table, columns, accepted, conflict)
+                    batch_rejects.extend({'row': numbers[index], 'errors': {
+                        'start_time': SHOW_CONFLICT_ERROR}} for index in sorted(skipped))
+                    accepted = [values for index, values in enumerate(accepted)
+                                if index not in skipped]
+                    if model is Show:
+                        count_bulk_shows(accepted)
+                    elif model is Venue:
+                        count_bulk_venues(accepted)
+                db.session.commit()
+                for reject in sorted(batch_rejects, key=itemgetter('row')):
+                    rejects.write(json.dumps(reject) + '\n')
+                rejects.flush()
+
+                stats['read'] += len(batch)
+                stats['imported'] += len(accepted)
+                stats['rejected'] += len(batch) - len(accepted)
+                _write_checkpoint(checkpoint, stats['read'])
+                elapsed = time.perf_counter() - started
+                echo('{read} rows read, {imported} imported, {rejected} rejected'.format(**stats) +
+                     ' ({:.0f} rows/s)'.format((stats['read'] - skip) / elapsed if elapsed else 0))
+        except Exception:
+            # the batch in flight is not checkpointed, so a rerun retries it
+            db.session.rollback()
+            raise
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,76 @@
+"""Connection pool instrumentation and the ``/metrics`` endpoint.
+
+``TimedQueuePool`` is a ``QueuePool`` that records how often connections
+are checked out and how long callers waited for one (including the time
+to open a new connection). ``/metrics`` reports those numbers with the
+pool's size, checked-out and overflow gauges in the Prometheus text
+format. Numbers are per process, so scrape every worker.
+"""
+import threading
+import time
+
+from flask import Response
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super(TimedQueuePool, self).__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            with self.stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self.stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def init_app(app, db):
+    """Instrument PostgreSQL engines and register ``GET /metrics``.
+
+    Must run before ``db.init_app(app)`` so the engine picks up the pool.
+    """
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        options.setdefault('poolclass', TimedQueuePool)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    @app.route('/metrics')
+    def metrics():
+        pool = db.engine.pool
+        lines = [
+            '# TYPE fyyur_db_pool_size gauge',
+            'fyyur_db_pool_size {}'.format(pool.size()),
+            '# TYPE fyyur_db_pool_checked_out gauge',
+            'fyyur_db_pool_checked_out {}'.format(pool.checkedout()),
+            '# TYPE fyyur_db_pool_overflow gauge',
+            'fyyur_db_pool_overflow {}'.format(max(pool.overflow(), 0)),
+        ]
+        if isinstance(pool, TimedQueuePool):
+            with pool.stats_lock:
+                lines += [
+                    '# TYPE fyyur_db_pool_checkouts_total counter',
+                    'fyyur_db_pool_checkouts_total {}'.format(pool.checkouts),
+                    '# TYPE fyyur_db_pool_timeouts_total counter',
+                    'fyyur_db_pool_timeouts_total {}'.format(pool.timeouts),
+                    '# TYPE fyyur_db_pool_checkout_wait_seconds_total counter',
+                    'fyyur_db_pool_checkout_wait_seconds_total {:.6f}'.format(pool.wait_total),
+                    '# TYPE fyyur_db_pool_checkout_wait_seconds_max gauge',
+                    'fyyur_db_pool_checkout_wait_seconds_max {:.6f}'.format(pool.wait_max),
+                ]
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,42 @@
+"""rename venue, artist and show to the plural table names the models use
+
+Revision ID: 0e7a4c9f2b16
+Revises: 20c24adde82f
+Create Date: 2026-10-18 21:02:37.504118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0e7a4c9f2b16'
+down_revision = '20c24adde82f'
+branch_labels = None
+depends_on = None
+
+# (old name, new name); the key and sequence names follow the tables so
+# that they match what db.create_all() makes for the models
+TABLES = [('venue', 'venues'), ('artist', 'artists'), ('show', 'shows')]
+CONSTRAINTS = [('show', 'show_artist_id_fkey', 'shows_artist_id_fkey'),
+               ('show', 'show_venue_id_fkey', 'shows_venue_id_fkey')]
+
+
+def rename(tables, constraints):
+    for old, new in tables:
+        op.rename_table(old, new)
+        op.execute('ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey'.format(old=old, new=new))
+        op.execute('ALTER SEQUENCE {old}_id_seq RENAME TO {new}_id_seq'.format(old=old, new=new))
+    renamed = dict(tables)
+    for table, old, new in constraints:
+        op.execute('ALTER TABLE {} RENAME CONSTRAINT {} TO {}'.format(
+            renamed.get(table, table), old, new))
+
+
+def upgrade():
+    rename(TABLES, CONSTRAINTS)
+
+
+def downgrade():
+    rename([(new, old) for old, new in reversed(TABLES)],
+           [('shows', new, old) for table, old, new in CONSTRAINTS])
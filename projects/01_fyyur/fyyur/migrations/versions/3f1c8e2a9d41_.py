@@ -0,0 +1,24 @@
+"""add composite (state, city) index on venues
+
+Revision ID: 3f1c8e2a9d41
+Revises: 0e7a4c9f2b16
+Create Date: 2026-10-18 10:12:03.118240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c8e2a9d41'
+down_revision = '0e7a4c9f2b16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_venues_state_city', 'venues', ['state', 'city'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venues_state_city', table_name='venues')
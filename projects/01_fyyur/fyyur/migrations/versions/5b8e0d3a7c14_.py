@@ -0,0 +1,26 @@
+"""index shows by (start_time, id) for the keyset show listings
+
+Revision ID: 5b8e0d3a7c14
+Revises: d3f8a61c2b95
+Create Date: 2026-10-19 09:12:44.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e0d3a7c14'
+down_revision = 'd3f8a61c2b95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /shows and /api/v1/shows page by (start_time, id); without this every
+    # page sorted the whole table
+    op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
@@ -0,0 +1,28 @@
+"""one show per venue and start time
+
+Revision ID: 7b3e91d5a0c6
+Revises: e4a7d2c9b813
+Create Date: 2026-10-18 20:02:17.540318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e91d5a0c6'
+down_revision = 'e4a7d2c9b813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # fails if the table already holds double bookings; resolve those first
+    op.create_unique_constraint('uq_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'])
+    # the constraint's index replaces the plain (venue_id, start_time) one
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+
+
+def downgrade():
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False)
+    op.drop_constraint('uq_shows_venue_id_start_time', 'shows', type_='unique')
@@ -0,0 +1,43 @@
+"""restore past/upcoming show counters on venues and artists
+
+Revision ID: 8d27b5c4e0f3
+Revises: 3f1c8e2a9d41
+Create Date: 2026-10-18 11:40:27.502113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d27b5c4e0f3'
+down_revision = '3f1c8e2a9d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venues', 'artists'):
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('shows', sa.Column('is_upcoming', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    # backfill from existing shows, same as `flask fyyur reconcile-counters`
+    op.execute("UPDATE shows SET is_upcoming = (start_time > localtimestamp)")
+    for table, fk in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.execute(
+            "UPDATE {table} SET "
+            "upcoming_shows_count = c.upcoming, past_shows_count = c.past "
+            "FROM (SELECT {fk}, "
+            "count(*) FILTER (WHERE is_upcoming) AS upcoming, "
+            "count(*) FILTER (WHERE NOT is_upcoming) AS past "
+            "FROM shows GROUP BY {fk}) c "
+            "WHERE {table}.id = c.{fk}".format(table=table, fk=fk)
+        )
+
+
+def downgrade():
+    op.drop_column('shows', 'is_upcoming')
+    for table in ('artists', 'venues'):
+        op.drop_column(table, 'upcoming_shows_count')
+        op.drop_column(table, 'past_shows_count')
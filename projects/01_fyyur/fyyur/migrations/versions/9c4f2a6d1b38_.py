@@ -0,0 +1,66 @@
+"""record feed refreshes in feed_refresh, not in the view's rows
+
+Revision ID: 9c4f2a6d1b38
+Revises: 5b8e0d3a7c14
+Create Date: 2026-10-19 14:37:05.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4f2a6d1b38'
+down_revision = '5b8e0d3a7c14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # an empty view had no refreshed_at to read, so every read refreshed it;
+    # with no row yet, the first read refreshes once and records the time
+    op.create_table('feed_refresh',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # same definition as feed.CREATE_VIEW_SQL / CREATE_INDEX_SQL
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS upcoming_shows_feed')
+    op.execute('''
+        CREATE MATERIALIZED VIEW upcoming_shows_feed AS
+        SELECT shows.id, shows.start_time,
+               venues.id AS venue_id, venues.name AS venue_name,
+               venues.city AS venue_city, venues.state AS venue_state,
+               artists.id AS artist_id, artists.name AS artist_name,
+               artists.image_link AS artist_image_link
+        FROM shows
+        JOIN venues ON venues.id = shows.venue_id
+        JOIN artists ON artists.id = shows.artist_id
+        WHERE shows.start_time > localtimestamp
+    ''')
+    op.execute('''
+        CREATE UNIQUE INDEX ix_upcoming_shows_feed_start_time_id
+            ON upcoming_shows_feed (start_time, id)
+    ''')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS upcoming_shows_feed')
+    op.execute('''
+        CREATE MATERIALIZED VIEW upcoming_shows_feed AS
+        SELECT shows.id, shows.start_time,
+               venues.id AS venue_id, venues.name AS venue_name,
+               venues.city AS venue_city, venues.state AS venue_state,
+               artists.id AS artist_id, artists.name AS artist_name,
+               artists.image_link AS artist_image_link,
+               now() AS refreshed_at
+        FROM shows
+        JOIN venues ON venues.id = shows.venue_id
+        JOIN artists ON artists.id = shows.artist_id
+        WHERE shows.start_time > localtimestamp
+    ''')
+    op.execute('''
+        CREATE UNIQUE INDEX ix_upcoming_shows_feed_start_time_id
+            ON upcoming_shows_feed (start_time, id)
+    ''')
+    op.drop_table('feed_refresh')
@@ -0,0 +1,43 @@
+"""genre facets: GIN index on venues.genres and venue_genre_counts
+
+Revision ID: a92f6c1d4e57
+Revises: 7b3e91d5a0c6
+Create Date: 2026-10-18 20:31:05.918244
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a92f6c1d4e57'
+down_revision = '7b3e91d5a0c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_venues_genres', 'venues', ['genres'], unique=False,
+                    postgresql_using='gin')
+    op.create_table('venue_genre_counts',
+    sa.Column('genre', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('genre', 'state')
+    )
+
+    # backfill from existing venues, same as `flask fyyur rebuild-facets`
+    op.execute('''
+        INSERT INTO venue_genre_counts (genre, state, count)
+        SELECT genre, state, count(*) FROM (
+            SELECT DISTINCT id, state, unnest(genres) AS genre FROM venues
+            UNION ALL
+            SELECT id, state, '' FROM venues
+        ) AS venue_genres
+        GROUP BY genre, state
+    ''')
+
+
+def downgrade():
+    op.drop_table('venue_genre_counts')
+    op.drop_index('ix_venues_genres', table_name='venues')
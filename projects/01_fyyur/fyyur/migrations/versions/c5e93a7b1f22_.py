@@ -0,0 +1,34 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: c5e93a7b1f22
+Revises: 8d27b5c4e0f3
+Create Date: 2026-10-18 13:05:51.730962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e93a7b1f22'
+down_revision = '8d27b5c4e0f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # as in models.py: where the server has no pg_trgm, search runs unindexed
+    available = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+    if available is None:
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venues_name_trgm', 'venues', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artists_name_trgm', 'artists', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_artists_name_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_venues_name_trgm')
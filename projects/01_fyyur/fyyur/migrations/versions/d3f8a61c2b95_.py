@@ -0,0 +1,58 @@
+"""cascade show deletes in the database; partitioned shows_archive
+
+Revision ID: d3f8a61c2b95
+Revises: f1c84b27d6e3
+Create Date: 2026-10-18 22:11:06.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8a61c2b95'
+down_revision = 'f1c84b27d6e3'
+branch_labels = None
+depends_on = None
+
+# the foreign keys were created under different names over the table's
+# history (show -> shows), so drop whichever ones exist
+DROP_SHOW_FOREIGN_KEYS = '''
+DO $$
+DECLARE
+    constraint_name text;
+BEGIN
+    FOR constraint_name IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'shows'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE shows DROP CONSTRAINT %I', constraint_name);
+    END LOOP;
+END $$
+'''
+
+
+def upgrade():
+    op.execute(DROP_SHOW_FOREIGN_KEYS)
+    op.create_foreign_key('shows_artist_id_fkey', 'shows', 'artists',
+                          ['artist_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('shows_venue_id_fkey', 'shows', 'venues',
+                          ['venue_id'], ['id'], ondelete='CASCADE')
+
+    op.create_table('shows_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'start_time'),
+    postgresql_partition_by='RANGE (start_time)'
+    )
+
+
+def downgrade():
+    # archived shows are dropped with the table; move them back first if needed
+    op.drop_table('shows_archive')
+    op.execute(DROP_SHOW_FOREIGN_KEYS)
+    op.create_foreign_key('shows_artist_id_fkey', 'shows', 'artists', ['artist_id'], ['id'])
+    op.create_foreign_key('shows_venue_id_fkey', 'shows', 'venues', ['venue_id'], ['id'])
@@ -0,0 +1,31 @@
+"""index shows by venue, artist and upcoming start_time
+
+Revision ID: e4a7d2c9b813
+Revises: c5e93a7b1f22
+Create Date: 2026-10-18 19:31:40.215873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7d2c9b813'
+down_revision = 'c5e93a7b1f22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], unique=False)
+    # only upcoming shows, kept small by roll_upcoming_shows; serves the
+    # roll itself and any "next shows" listing
+    op.create_index('ix_shows_upcoming_start_time', 'shows', ['start_time'], unique=False,
+                    postgresql_where=sa.text('is_upcoming'))
+
+
+def downgrade():
+    op.drop_index('ix_shows_upcoming_start_time', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
@@ -0,0 +1,41 @@
+"""upcoming_shows_feed materialized view
+
+Revision ID: f1c84b27d6e3
+Revises: a92f6c1d4e57
+Create Date: 2026-10-18 21:04:52.337190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c84b27d6e3'
+down_revision = 'a92f6c1d4e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # same definition as feed.CREATE_VIEW_SQL / CREATE_INDEX_SQL
+    op.execute('''
+        CREATE MATERIALIZED VIEW upcoming_shows_feed AS
+        SELECT shows.id, shows.start_time,
+               venues.id AS venue_id, venues.name AS venue_name,
+               venues.city AS venue_city, venues.state AS venue_state,
+               artists.id AS artist_id, artists.name AS artist_name,
+               artists.image_link AS artist_image_link,
+               now() AS refreshed_at
+        FROM shows
+        JOIN venues ON venues.id = shows.venue_id
+        JOIN artists ON artists.id = shows.artist_id
+        WHERE shows.start_time > localtimestamp
+    ''')
+    op.execute('''
+        CREATE UNIQUE INDEX ix_upcoming_shows_feed_start_time_id
+            ON upcoming_shows_feed (start_time, id)
+    ''')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS upcoming_shows_feed')
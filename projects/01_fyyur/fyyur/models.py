@@ -1,13 +1,31 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import DDL, event, text
 
 app = Flask(__name__)
 db = SQLAlchemy()
 migrate = Migrate(app, db)
 
+def has_pg_trgm(ddl, target, bind, **kw):
+    return bind.execute(text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
+# the name search indexes below use its gin_trgm_ops; where the server has
+# no pg_trgm the search still works, without an index
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+                 dialect='postgresql', callable_=has_pg_trgm))
+
 class Venue(db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        db.Index('ix_venues_state_city', 'state', 'city'),
+        db.Index('ix_venues_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(
+                     dialect='postgresql', callable_=has_pg_trgm),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
@@ -20,10 +38,27 @@ class Venue(db.Model):
     seeking_description = db.Column(db.String(500))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    shows = db.relationship('Show', backref='venues', lazy=True)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # shows go with their venue through ON DELETE CASCADE, without loading them
+    shows = db.relationship('Show', back_populates='venue', lazy=True,
+                            cascade='all, delete-orphan', passive_deletes=True)
+
+class VenueGenreCount(db.Model):
+    # venues per (genre, state) for the /venues facets, see facets.py;
+    # genre '' counts every venue in the state
+    __tablename__ = 'venue_genre_counts'
+    genre = db.Column(db.String(120), primary_key=True)
+    state = db.Column(db.String(120), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Artist(db.Model):
     __tablename__ ='artists'
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(
+                     dialect='postgresql', callable_=has_pg_trgm),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
@@ -35,17 +70,48 @@ class Artist(db.Model):
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='artists', lazy=True)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    shows = db.relationship('Show', back_populates='artist', lazy=True,
+                            cascade='all, delete-orphan', passive_deletes=True)
 
 
 class Show(db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        # one show per venue and start time; also serves venue lookups
+        db.UniqueConstraint('venue_id', 'start_time', name='uq_shows_venue_id_start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        # the keyset order of /shows and /api/v1/shows
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+        db.Index('ix_shows_upcoming_start_time', 'start_time',
+                 postgresql_where=db.text('is_upcoming')),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'),
+                          nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'),
+                         nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
-    venue = db.relationship('Venue', backref = 'shows_venue', cascade='all, delete')
-    artist = db.relationship('Artist', backref = 'shows_artist', cascade='all, delete')
+    # which of the venue/artist counters this show is counted in, see counters.py
+    is_upcoming = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    venue = db.relationship('Venue', back_populates='shows')
+    artist = db.relationship('Artist', back_populates='shows')
+
 
+class ArchivedShow(db.Model):
+    # shows moved out of `shows` by archive.py, one partition per year
+    __tablename__ = 'shows_archive'
+    __table_args__ = {'postgresql_partition_by': 'RANGE (start_time)'}
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_time = db.Column(db.DateTime, primary_key=True)
+    artist_id = db.Column(db.Integer, nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
 
 
+class FeedRefresh(db.Model):
+    # when feed.py last refreshed upcoming_shows_feed; a single row, id 1
+    __tablename__ = 'feed_refresh'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    refreshed_at = db.Column(db.DateTime(timezone=True), nullable=False)
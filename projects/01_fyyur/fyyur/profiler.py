@@ -0,0 +1,141 @@
+"""Opt-in per-request SQL profiler.
+
+Set ``SQL_PROFILER = True`` (env ``SQL_PROFILER=1``) to time every
+statement a request runs. Each profiled response gets a ``Server-Timing``
+header with the database time and query count. A one-line JSON summary of
+the request is written to the ``fyyur.sql`` logger, and the most recent
+summaries are served at ``GET /_profiler``.
+
+The summary flags N+1 patterns: the same SQL text executed
+``SQL_PROFILER_REPEAT_THRESHOLD`` or more times in one request. A query
+slower than ``SQL_SLOW_QUERY_MS`` is logged at WARNING level with its
+``EXPLAIN`` plan.
+
+Queries that run while a streamed body is being sent (``/artists``) happen
+after the response headers are written, so they are not counted.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('fyyur.sql')
+
+
+class RequestProfile(object):
+    """Statements seen while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+        self.slow = []
+
+    def summary(self, response, repeat_threshold):
+        repeated = [{'statement': statement, 'count': count}
+                    for statement, count in self.statements.most_common()
+                    if count >= repeat_threshold]
+        return {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'db_ms': round(self.db_seconds * 1000, 2),
+            'queries': self.queries,
+            'repeated': repeated,
+            'slow': self.slow,
+        }
+
+
+def _explain(cursor, statement, parameters):
+    # a fresh DBAPI cursor on the same connection, so the EXPLAIN runs
+    # inside the request's transaction without re-entering these events;
+    # under a SAVEPOINT, since a failed EXPLAIN would abort that transaction
+    explain = cursor.connection.cursor()
+    try:
+        explain.execute('SAVEPOINT sql_profiler_explain')
+        try:
+            explain.execute('EXPLAIN ' + statement, parameters)
+            plan = '\n'.join(str(row[-1]) for row in explain.fetchall())
+        except Exception as error:
+            explain.execute('ROLLBACK TO SAVEPOINT sql_profiler_explain')
+            plan = 'EXPLAIN failed: {}'.format(error)
+        explain.execute('RELEASE SAVEPOINT sql_profiler_explain')
+        return plan
+    finally:
+        explain.close()
+
+
+class SQLProfiler(object):
+
+    def __init__(self, app=None):
+        self.recent = deque(maxlen=100)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_PROFILER', False)
+        self.slow_seconds = app.config.get('SQL_SLOW_QUERY_MS', 100) / 1000.0
+        self.repeat_threshold = app.config.get('SQL_PROFILER_REPEAT_THRESHOLD', 5)
+        app.extensions['sql_profiler'] = self
+        if not self.enabled:
+            return
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+        @app.route('/_profiler')
+        def sql_profile():
+            with self._lock:
+                return jsonify(list(self.recent))
+
+    def _start(self):
+        g.sql_profile = RequestProfile()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append((context, time.perf_counter()))
+
+    def _handle_error(self, context):
+        # a failed statement never reaches after_cursor_execute; errors
+        # raised after it (or before the cursor ran) leave the stack alone
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started and started[-1][0] is context.execution_context:
+            started.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()[1]
+        profile = g.get('sql_profile') if has_request_context() else None
+        if profile is None:
+            return
+        profile.queries += 1
+        profile.db_seconds += elapsed
+        profile.statements[statement] += 1
+        if elapsed >= self.slow_seconds:
+            slow = {'statement': statement, 'ms': round(elapsed * 1000, 2)}
+            if not executemany and statement.lstrip()[:6].upper() == 'SELECT':
+                slow['plan'] = _explain(cursor, statement, parameters)
+            profile.slow.append(slow)
+            logger.warning('slow query %s', json.dumps(slow))
+
+    def _finish(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        summary = profile.summary(response, self.repeat_threshold)
+        response.headers.add('Server-Timing', 'db;dur={:.2f};desc="{} queries"'.format(
+            summary['db_ms'], summary['queries']))
+        if request.endpoint != 'sql_profile':
+            with self._lock:
+                self.recent.append(summary)
+        logger.info(json.dumps(summary))
+        return response
@@ -0,0 +1,100 @@
+"""Name search for venues and artists.
+
+On PostgreSQL the search is a case-insensitive substring match served by
+the ``pg_trgm`` GIN indexes declared on the models (and created in
+migration ``c5e93a7b1f22``). Other databases (SQLite test runs) fall back
+to an in-process trigram inverted index that is rebuilt lazily after any
+venue or artist write.
+
+Both backends rank the same way: names starting with the term first,
+then shorter (closer) names, then alphabetically.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from models import db, Venue, Artist
+
+SEARCH_LIMIT = 50
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _rank(term, name):
+    return (not name.startswith(term), len(name), name)
+
+
+class NameIndex(object):
+    """In-process trigram inverted index over one model's ``name`` column."""
+
+    def __init__(self, model):
+        self.model = model
+        self.stale = True
+        self.names = {}
+        self.postings = {}
+
+    def invalidate(self, *args):
+        self.stale = True
+
+    def rebuild(self):
+        names = {}
+        postings = defaultdict(set)
+        for id, name in db.session.query(self.model.id, self.model.name):
+            names[id] = name.lower()
+            for gram in _trigrams(names[id]):
+                postings[gram].add(id)
+        self.names = names
+        self.postings = dict(postings)
+        self.stale = False
+
+    def search(self, term, limit=SEARCH_LIMIT):
+        """Return the ids of the best ``limit`` names containing ``term``."""
+        if self.stale:
+            self.rebuild()
+        term = term.lower()
+        grams = _trigrams(term)
+        if grams:
+            postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set.intersection(*postings)
+        else:
+            candidates = self.names
+        matches = [id for id in candidates if term in self.names[id]]
+        matches.sort(key=lambda id: _rank(term, self.names[id]))
+        return matches[:limit]
+
+
+_indexes = {}
+
+for _model in (Venue, Artist):
+    _indexes[_model] = NameIndex(_model)
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _indexes[_model].invalidate)
+
+
+def search_names(model, term, limit=SEARCH_LIMIT):
+    """Return up to ``limit`` ranked ``model`` rows whose name contains ``term``.
+
+    Rows carry ``id``, ``name`` and ``upcoming_shows_count``.
+    """
+    columns = (model.id, model.name, model.upcoming_shows_count)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        pattern = _escape_like(term)
+        return db.session.query(*columns).\
+            filter(model.name.ilike('%' + pattern + '%', escape='\\')).\
+            order_by(
+                model.name.ilike(pattern + '%', escape='\\').desc(),
+                db.func.length(model.name),
+                db.func.lower(model.name)
+            ).\
+            limit(limit).\
+            all()
+
+    ids = _indexes[model].search(term, limit)
+    rows = {row.id: row for row in db.session.query(*columns).filter(model.id.in_(ids))}
+    return [rows[id] for id in ids if id in rows]
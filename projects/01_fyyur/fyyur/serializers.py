@@ -0,0 +1,102 @@
+"""Declarative row serializers shared by the views and the JSON API.
+
+A ``Schema`` names the keys of the dicts it produces. Each key is read from
+the attribute of the same name, or from the one given in ``sources``. It
+can optionally be passed through a function from ``convert``. The schema
+builds one ``attrgetter``/``itemgetter`` that fetches every value in a
+single call, then zips the values with the keys and applies only the
+converters it has.
+
+``dump``/``dump_all`` read attributes, so they take ORM objects or
+anything else. ``dump_rows`` is for ``Row`` tuples from column queries. It
+resolves each source to its column position once per result layout and
+reads the values by index, which avoids ``Row``'s comparatively slow
+attribute lookup. See ``benchmarks/bench_serializers.py``.
+"""
+from operator import attrgetter, itemgetter
+
+from facets import GENRE_LABELS
+from models import Artist
+
+
+def genre_labels(genres):
+    return [GENRE_LABELS.get(genre, genre) for genre in genres or ()]
+
+
+class Schema(object):
+    """Dicts with ``keys``; ``sources`` and ``convert`` are keyed by output key."""
+
+    def __init__(self, keys, sources=None, convert=None):
+        self.keys = tuple(keys)
+        self.sources = dict((key, key) for key in self.keys)
+        self.sources.update(sources or {})
+        self.convert = dict(convert or {})
+        self._dump = self._compile(attrgetter, [self.sources[key] for key in self.keys])
+        self._row_dumpers = {}
+
+    def _compile(self, getter, sources):
+        keys = self.keys
+        get_values = getter(*sources)
+        if len(sources) == 1:
+            # a single-item getter returns the bare value, not a 1-tuple
+            get_value = get_values
+            get_values = lambda row: (get_value(row),)  # noqa: E731
+        converters = [(index, self.convert[key]) for index, key in enumerate(keys)
+                      if key in self.convert]
+        if not converters:
+            return lambda row: dict(zip(keys, get_values(row)))
+
+        def dump(row):
+            values = list(get_values(row))
+            for index, convert in converters:
+                values[index] = convert(values[index])
+            return dict(zip(keys, values))
+        return dump
+
+    def _row_dumper(self, fields):
+        dump = self._row_dumpers.get(fields)
+        if dump is None:
+            missing = set(self.sources.values()) - set(fields)
+            if missing:
+                raise ValueError('rows have no column(s) {}'.format(', '.join(sorted(missing))))
+            dump = self._compile(itemgetter, [fields.index(self.sources[key]) for key in self.keys])
+            self._row_dumpers[fields] = dump
+        return dump
+
+    def dump(self, obj):
+        return self._dump(obj)
+
+    def dump_all(self, objects):
+        dump = self._dump
+        return [dump(obj) for obj in objects]
+
+    def dump_rows(self, rows):
+        """Serialize a list of ``Row`` tuples that all share one layout."""
+        if not rows:
+            return []
+        dump = self._row_dumper(tuple(rows[0]._fields))
+        return [dump(row) for row in rows]
+
+
+VENUE = Schema(('id', 'name', 'genres', 'city', 'state', 'phone', 'address', 'website',
+                'facebook_link', 'seeking_talent', 'seeking_description', 'image_link'),
+               convert={'genres': genre_labels})
+ARTIST = Schema(('id', 'name', 'genres', 'city', 'state', 'phone', 'website',
+                 'facebook_link', 'seeking_venue', 'seeking_description', 'image_link'),
+                convert={'genres': genre_labels})
+AREA_VENUE = Schema(('city', 'state', 'id', 'name'))
+SEARCH_RESULT = Schema(('id', 'name', 'num_upcoming_shows'),
+                       sources={'num_upcoming_shows': 'upcoming_shows_count'})
+VENUE_SHOW = Schema(('artist_id', 'artist_name', 'artist_image_link', 'start_time'))
+ARTIST_SHOW = Schema(('venue_id', 'venue_name', 'venue_image_link', 'start_time'))
+SHOW = Schema(('id', 'artist_id', 'artist_name', 'artist_image_link',
+               'venue_id', 'venue_name', 'start_time'))
+FEED_SHOW = Schema(('id', 'start_time', 'venue_id', 'venue_name', 'venue_city', 'venue_state',
+                    'artist_id', 'artist_name', 'artist_image_link'))
+
+# JSON API (api.py): raw column values, as stored
+API_VENUE = Schema(('id', 'name', 'city', 'state', 'upcoming_shows_count'))
+API_ARTIST = Schema(Artist.__table__.c.keys())
+API_ARTIST_SHOW = Schema(('start_time', 'venue_id', 'venue_name', 'venue_image_link'))
+API_SHOW = Schema(('id', 'start_time', 'venue_id', 'venue_name',
+                   'artist_id', 'artist_name', 'artist_image_link'))
@@ -0,0 +1,604 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from html import unescape
+from unittest import mock
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import ProgrammingError
+
+os.environ.setdefault('DATABASE_URL', 'postgresql:///fyyur_test')
+os.environ.setdefault('SQL_PROFILER', '1')
+# the tests exercise the profiler, but keep their logs out of the tree
+os.environ.setdefault('ERROR_LOG', os.devnull)
+os.environ.setdefault('SQL_LOG', os.devnull)
+
+import api
+import datagen
+import importer
+import profiler
+import serializers
+from app import app, response_cache
+from models import db, Venue, Artist, Show, ArchivedShow
+from archive import archive_shows
+from counters import roll_upcoming_shows, reconcile_show_counts
+from search import NameIndex
+from importer import import_file
+from formatting import format_datetime
+from facets import venue_facets
+from feed import ensure_fresh, feed_age, refresh_feed, upcoming_page
+
+
+def call_api(path, query_string=b''):
+    """Run one GET through the ASGI API; returns (status, json body)."""
+    async def run():
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            messages.append(message)
+
+        api.startup()
+        try:
+            await api.asgi_app({'type': 'http', 'method': 'GET', 'path': path,
+                                'query_string': query_string}, receive, send)
+        finally:
+            await api.shutdown()
+        return messages[0]['status'], json.loads(messages[1]['body'])
+    return asyncio.run(run())
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents the fyyur test case"""
+
+    def setUp(self):
+        """Define test variables and create a fresh schema."""
+        self.app = app
+        self.client = self.app.test_client
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        response_cache.clear()
+
+        self.venue = Venue(name='The Musical Hop', city='San Francisco',
+                           state='CA', address='1015 Folsom Street',
+                           phone='123-123-1234', genres=['Jazz'])
+        self.artist = Artist(name='Guns N Petals', city='San Francisco',
+                             state='CA', phone='326-123-5000',
+                             genres=['Rock_n_Roll'])
+        db.session.add_all([self.venue, self.artist])
+        db.session.flush()
+        now = datetime.now()
+        db.session.add_all([
+            Show(venue_id=self.venue.id, artist_id=self.artist.id,
+                 start_time=now - timedelta(days=30)),
+            Show(venue_id=self.venue.id, artist_id=self.artist.id,
+                 start_time=now + timedelta(days=30)),
+            Show(venue_id=self.venue.id, artist_id=self.artist.id,
+                 start_time=now + timedelta(days=60)),
+        ])
+        db.session.commit()
+        self.venue_id = self.venue.id
+        self.artist_id = self.artist.id
+
+    def tearDown(self):
+        """Executed after reach test"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_show_venue_splits_past_and_upcoming(self):
+        res = self.client().get('/venues/{}'.format(self.venue_id))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'2 Upcoming Shows', res.data)
+        self.assertIn(b'1 Past Show', res.data)
+
+    def test_show_artist_splits_past_and_upcoming(self):
+        res = self.client().get('/artists/{}'.format(self.artist_id))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'2 Upcoming Shows', res.data)
+        self.assertIn(b'1 Past Show', res.data)
+
+    def test_show_venue_without_shows(self):
+        venue = Venue(name='Park Square', city='Austin', state='TX',
+                      address='34 Whiskey Moore Ave', phone='415-000-1234')
+        db.session.add(venue)
+        db.session.commit()
+
+        res = self.client().get('/venues/{}'.format(venue.id))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'0 Upcoming Shows', res.data)
+        self.assertIn(b'0 Past Shows', res.data)
+
+    def test_show_counters_follow_inserts(self):
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual(venue.upcoming_shows_count, 2)
+        self.assertEqual(venue.past_shows_count, 1)
+
+        db.session.add(Show(venue_id=self.venue_id, artist_id=self.artist_id,
+                            start_time=datetime.now() - timedelta(days=1)))
+        db.session.commit()
+
+        artist = Artist.query.get(self.artist_id)
+        self.assertEqual(artist.upcoming_shows_count, 2)
+        self.assertEqual(artist.past_shows_count, 2)
+
+    def test_roll_upcoming_shows(self):
+        rolled = roll_upcoming_shows(now=datetime.now() + timedelta(days=45))
+
+        self.assertEqual(rolled, 1)
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual(venue.upcoming_shows_count, 1)
+        self.assertEqual(venue.past_shows_count, 2)
+
+    def test_reconcile_show_counts(self):
+        db.session.execute(Venue.__table__.update().values(
+            upcoming_shows_count=0, past_shows_count=0))
+        db.session.commit()
+
+        fixed = reconcile_show_counts()
+
+        self.assertEqual(fixed, (1, 0))
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual(venue.upcoming_shows_count, 2)
+        self.assertEqual(venue.past_shows_count, 1)
+
+    def test_show_delete_updates_counters(self):
+        show = Show.query.filter(Show.start_time < datetime.now()).one()
+        db.session.delete(show)
+        db.session.commit()
+
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual((venue.past_shows_count, venue.upcoming_shows_count), (0, 2))
+        artist = Artist.query.get(self.artist_id)
+        self.assertEqual((artist.past_shows_count, artist.upcoming_shows_count), (0, 2))
+
+    def test_delete_venue_cascades_its_shows_in_the_database(self):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', record)
+
+        res = self.client().post('/venues/{}'.format(self.venue_id))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse([sql for sql in statements if sql.startswith('SELECT shows.')])
+        db.session.remove()
+        self.assertEqual(Show.query.count(), 0)
+        artist = Artist.query.get(self.artist_id)
+        self.assertEqual((artist.past_shows_count, artist.upcoming_shows_count), (0, 0))
+
+    def test_archive_shows_moves_old_shows(self):
+        moved = archive_shows(datetime.now() - timedelta(days=1), batch_size=1)
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(Show.query.count(), 2)
+        self.assertEqual(ArchivedShow.query.count(), 1)
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual((venue.past_shows_count, venue.upcoming_shows_count), (0, 2))
+        self.assertEqual(archive_shows(datetime.now()), 0)
+        with self.assertRaises(ValueError):
+            archive_shows(datetime.now() + timedelta(days=1))
+
+    def test_search_artists_ranks_prefix_matches_first(self):
+        db.session.add_all([
+            Artist(name='The Wild Sax Band', city='San Francisco', state='CA',
+                   phone='432-325-5432'),
+            Artist(name='Sax', city='San Francisco', state='CA',
+                   phone='432-325-5432'),
+        ])
+        db.session.commit()
+
+        res = self.client().post('/artists/search', data={'search_term': 'sAx'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'": 2', res.data)
+        self.assertLess(res.data.index(b'<h5>Sax</h5>'),
+                        res.data.index(b'The Wild Sax Band'))
+
+    def test_name_index_fallback(self):
+        index = NameIndex(Venue)
+
+        self.assertEqual(index.search('musical'), [self.venue_id])
+        self.assertEqual(index.search('hop'), [self.venue_id])
+        self.assertEqual(index.search('nowhere'), [])
+
+    def test_artists_keyset_pagination(self):
+        db.session.add(Artist(name='Matt Quevedo', city='New York',
+                              state='NY', phone='300-400-5000'))
+        db.session.commit()
+
+        res = self.client().get('/artists?limit=1')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'Guns N Petals', res.data)
+        self.assertNotIn(b'Matt Quevedo', res.data)
+        self.assertIn('after={}'.format(self.artist_id).encode(), res.data)
+
+        res = self.client().get('/artists?limit=1&after={}'.format(self.artist_id))
+
+        self.assertIn(b'Matt Quevedo', res.data)
+        self.assertNotIn(b'More artists', res.data)
+
+    def test_streamed_artists_release_their_connection(self):
+        response_cache.enabled = False  # render (and stream) every request
+        self.addCleanup(setattr, response_cache, 'enabled', True)
+        db.session.remove()
+        for _ in range(3):
+            res = self.client().get('/artists')
+            res.get_data()
+            res.close()
+
+        self.assertEqual(db.engine.pool.checkedout(), 0)
+
+    def test_cached_artists_page_is_still_streamed(self):
+        db.session.add_all(Artist(name='Artist {}'.format(n), city='Austin', state='TX',
+                                  phone='415-000-1234') for n in range(200))
+        db.session.commit()
+
+        res = self.client().get('/artists?limit=200', buffered=False)
+        chunks = iter(res.response)
+        first = next(chunks)
+
+        self.assertIn(b'<!doctype html>', first)
+        self.assertNotIn(b'Artist 198', first)
+        self.assertFalse(response_cache.backend._entries)
+        body = first + b''.join(chunks)
+        res.close()
+        self.assertIn(b'Artist 198', body)
+
+        res = self.client().get('/artists?limit=200')
+        self.assertEqual(res.data, body)
+        self.assertIn('ETag', res.headers)
+
+    def test_cached_page_revalidates_with_etag(self):
+        res = self.client().get('/venues/{}'.format(self.venue_id))
+        etag = res.headers['ETag']
+
+        res = self.client().get('/venues/{}'.format(self.venue_id),
+                                headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_new_show_invalidates_cached_pages(self):
+        res = self.client().get('/artists/{}'.format(self.artist_id))
+        self.assertIn(b'2 Upcoming Shows', res.data)
+
+        res = self.client().post('/shows/create', data={
+            'artist_id': self.artist_id,
+            'venue_id': self.venue_id,
+            'start_time': '2099-01-01 20:00:00',
+        })
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client().get('/artists/{}'.format(self.artist_id))
+        self.assertIn(b'3 Upcoming Shows', res.data)
+
+    def test_bulk_booking_reports_each_row(self):
+        slot = {'venue_id': self.venue_id, 'artist_id': self.artist_id,
+                'start_time': '2099-01-01 20:00:00'}
+        res = self.client().post('/shows/bulk', json={'shows': [
+            slot,
+            slot,
+            dict(slot, venue_id=1000, start_time='2099-01-02 20:00:00'),
+            dict(slot, start_time='not a date'),
+            dict(slot, venue_id=99999999999, start_time='2099-01-03 20:00:00'),
+        ]})
+
+        self.assertEqual(res.status_code, 200)
+        body = res.get_json()
+        self.assertEqual(body['created'], 1)
+        self.assertEqual([result['status'] for result in body['results']],
+                         ['created', 'conflict', 'unknown', 'invalid', 'invalid'])
+        self.assertIn('venue_id', body['results'][4]['errors'])
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual(venue.upcoming_shows_count, 3)
+
+    def test_double_booking_is_rejected(self):
+        data = {'artist_id': self.artist_id, 'venue_id': self.venue_id,
+                'start_time': '2099-01-01 20:00:00'}
+        self.client().post('/shows/create', data=data)
+
+        res = self.client().post('/shows/create', data=data)
+
+        self.assertIn(b'already booked', res.data)
+        self.assertEqual(Show.query.filter_by(venue_id=self.venue_id).count(), 4)
+
+    def test_import_shows_resumes_and_rejects(self):
+        path = os.path.join(tempfile.mkdtemp(), 'shows.ndjson')
+        with open(path, 'w') as handle:
+            for row in [
+                {'artist_id': self.artist_id, 'venue_id': self.venue_id,
+                 'start_time': '2099-05-21 21:30:00'},
+                {'artist_id': self.artist_id, 'venue_id': 999,
+                 'start_time': '2099-05-21 21:30:00'},
+                {'artist_id': self.artist_id, 'venue_id': self.venue_id,
+                 'start_time': 'tomorrow'},
+                {'artist_id': self.artist_id, 'venue_id': self.venue_id,
+                 'start_time': '2001-05-21 21:30:00'},
+            ]:
+                handle.write(json.dumps(row) + '\n')
+        with open(path + '.checkpoint', 'w') as handle:
+            json.dump({'rows': 1}, handle)
+
+        stats = import_file('shows', path, batch_size=2, echo=lambda line: None)
+
+        self.assertEqual((stats['read'], stats['imported'], stats['rejected']), (4, 1, 2))
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+        venue = Venue.query.get(self.venue_id)
+        self.assertEqual(venue.past_shows_count, 2)
+        self.assertEqual(venue.upcoming_shows_count, 2)
+
+    def test_import_rejects_double_bookings(self):
+        path = os.path.join(tempfile.mkdtemp(), 'shows.ndjson')
+        slot = {'artist_id': self.artist_id, 'venue_id': self.venue_id,
+                'start_time': '2099-05-21 21:30:00'}
+        with open(path, 'w') as handle:
+            for row in [slot, slot, dict(slot, start_time='2099-05-22 21:30:00'), slot]:
+                handle.write(json.dumps(row) + '\n')
+
+        stats = import_file('shows', path, batch_size=3, echo=lambda line: None)
+
+        self.assertEqual((stats['read'], stats['imported'], stats['rejected']), (4, 2, 2))
+        with open(path + '.rejects.ndjson') as handle:
+            rejects = [json.loads(line) for line in handle]
+        self.assertEqual([reject['row'] for reject in rejects], [2, 4])
+        self.assertIn('already booked', rejects[0]['errors']['start_time'])
+        self.assertEqual(Venue.query.get(self.venue_id).upcoming_shows_count, 4)
+
+    def test_import_rerun_does_not_repeat_rejects(self):
+        path = os.path.join(tempfile.mkdtemp(), 'shows.ndjson')
+        slot = {'artist_id': self.artist_id, 'venue_id': self.venue_id}
+        with open(path, 'w') as handle:
+            for start_time in ('2099-05-21 21:30:00', 'tomorrow',
+                               '2099-05-22 21:30:00', 'next week'):
+                handle.write(json.dumps(dict(slot, start_time=start_time)) + '\n')
+        write_batch = importer.write_batch
+        calls = []
+
+        def fail_second_batch(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return write_batch(*args)
+
+        with mock.patch('importer.write_batch', fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                import_file('shows', path, batch_size=2, echo=lambda line: None)
+        stats = import_file('shows', path, batch_size=2, echo=lambda line: None)
+
+        self.assertEqual((stats['read'], stats['imported'], stats['rejected']), (4, 1, 1))
+        with open(path + '.rejects.ndjson') as handle:
+            self.assertEqual([json.loads(line)['row'] for line in handle], [2, 4])
+
+    def test_seed_is_deterministic_across_workers(self):
+        anchor = datetime(2030, 1, 1)
+        seeded = []
+        for workers in (1, 3):
+            datagen.reset()
+            datagen.load(4, 6, 50, seed=7, anchor=anchor, workers=workers, batch_size=20)
+            seeded.append([(show.venue_id, show.artist_id, show.start_time)
+                           for show in Show.query.order_by(Show.id)])
+
+        self.assertEqual(len(seeded[0]), 50)
+        self.assertEqual(seeded[0], seeded[1])
+        venue = Venue.query.get(1)
+        self.assertEqual(venue.past_shows_count + venue.upcoming_shows_count, 13)
+        self.assertIn(venue.state, datagen.STATES)
+        self.assertEqual(sum(count for state, count in venue_facets()[1]), 4)
+        venue = Venue(name='Park Square', city='Austin', state='TX',
+                      address='34 Whiskey Moore Ave', phone='415-000-1234')
+        db.session.add(venue)
+        db.session.commit()
+        self.assertEqual(venue.id, 5)
+
+    def test_metrics_reports_pool_usage(self):
+        self.client().get('/venues')
+
+        res = self.client().get('/metrics')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'fyyur_db_pool_size 5', res.data)
+        self.assertIn(b'fyyur_db_pool_checkouts_total', res.data)
+        self.assertIn(b'fyyur_db_pool_checkout_wait_seconds_max', res.data)
+
+    def test_sql_profiler_reports_queries(self):
+        res = self.client().get('/venues/{}'.format(self.venue_id))
+
+        self.assertIn('db;dur=', res.headers['Server-Timing'])
+        summary = self.client().get('/_profiler').get_json()[-1]
+        self.assertEqual(summary['path'], '/venues/{}'.format(self.venue_id))
+        self.assertGreaterEqual(summary['queries'], 1)
+        self.assertEqual(summary['repeated'], [])
+
+    def test_sql_profiler_forgets_failed_statements(self):
+        with db.engine.connect() as connection:
+            with self.assertRaises(ProgrammingError):
+                connection.execute(text('SELECT * FROM no_such_table'))
+            connection.rollback()
+            connection.execute(text('SELECT 1'))
+
+            self.assertEqual(connection.info['query_started'], [])
+
+    def test_failed_explain_leaves_the_transaction_usable(self):
+        cursor = db.session.connection().connection.cursor()
+
+        plan = profiler._explain(cursor, 'SELECT no_such_column FROM venues', None)
+
+        self.assertIn('EXPLAIN failed', plan)
+        self.assertEqual(db.session.query(Venue.name).scalar(), 'The Musical Hop')
+
+    def test_sql_profiler_explains_slow_queries(self):
+        profiler = app.extensions['sql_profiler']
+        profiler.slow_seconds, slow_seconds = 0, profiler.slow_seconds
+        try:
+            self.client().get('/artists/{}'.format(self.artist_id))
+        finally:
+            profiler.slow_seconds = slow_seconds
+
+        summary = self.client().get('/_profiler').get_json()[-1]
+        self.assertTrue(summary['slow'])
+        self.assertIn('Scan', summary['slow'][0]['plan'])
+
+    def test_format_datetime_accepts_datetimes_and_strings(self):
+        when = datetime(2035, 4, 1, 20, 0)
+
+        self.assertEqual(format_datetime(when, 'full'), 'Sunday April, 1, 2035 at 8:00PM')
+        self.assertEqual(format_datetime('2035-04-01T20:00:00.000Z', 'full'),
+                         format_datetime(when, 'full'))
+        self.assertEqual(format_datetime(when, 'medium'), 'Sun 04, 01, 2035 8:00PM')
+
+    def test_schema_dumps_objects_and_rows_alike(self):
+        schema = serializers.SEARCH_RESULT
+        row = db.session.query(Venue.upcoming_shows_count, Venue.name, Venue.id).one()
+
+        self.assertEqual(schema.dump_rows([row]), [schema.dump(row)])
+        self.assertEqual(schema.dump(row), {'id': self.venue_id, 'name': 'The Musical Hop',
+                                            'num_upcoming_shows': 2})
+        self.assertEqual(serializers.VENUE.dump(Venue.query.get(self.venue_id))['genres'],
+                         ['Jazz'])
+        with self.assertRaises(ValueError):
+            schema.dump_rows(db.session.query(Venue.id, Venue.name).all())
+
+    def test_api_artist_fans_out_shows(self):
+        status, artist = call_api('/api/v1/artists/{}'.format(self.artist_id))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(artist['name'], 'Guns N Petals')
+        self.assertEqual(len(artist['past_shows']), 1)
+        self.assertEqual(len(artist['upcoming_shows']), 2)
+        self.assertEqual(call_api('/api/v1/artists/1000')[0], 404)
+
+    def test_api_shows_keyset_pagination(self):
+        status, first = call_api('/api/v1/shows', b'limit=2')
+        _, second = call_api('/api/v1/shows', 'limit=2&after={}'.format(first['next']).encode())
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(first['data']), 2)
+        self.assertEqual(len(second['data']), 1)
+        self.assertIsNone(second['next'])
+        self.assertEqual(call_api('/api/v1/shows', b'after=nope')[0], 400)
+
+    def test_venue_facets_follow_edits(self):
+        other = Venue(name='Park Square', city='Austin', state='TX',
+                      address='34 Whiskey Moore Ave', phone='415-000-1234',
+                      genres=['Jazz', 'R_B'])
+        db.session.add(other)
+        db.session.commit()
+        venue = Venue.query.get(self.venue_id)
+        venue.state = 'TX'
+        venue.genres = ['Jazz', 'Blues']
+        db.session.commit()
+
+        genres, states = venue_facets()
+        self.assertEqual(genres, [('Jazz', 2, 'Jazz'), ('Blues', 1, 'Blues'), ('R_B', 1, 'R&B')])
+        self.assertEqual(states, [('TX', 2)])
+        self.assertEqual(venue_facets(genre='Blues')[1], [('TX', 1)])
+
+        db.session.delete(other)
+        db.session.commit()
+        self.assertEqual(venue_facets()[0], [('Blues', 1, 'Blues'), ('Jazz', 1, 'Jazz')])
+
+    def test_venues_filtered_by_genre_and_state(self):
+        db.session.add(Venue(name='Park Square', city='Austin', state='TX',
+                             address='34 Whiskey Moore Ave', phone='415-000-1234',
+                             genres=['Blues']))
+        db.session.commit()
+
+        res = self.client().get('/venues?genre=Jazz&state=CA')
+
+        self.assertIn(b'The Musical Hop', res.data)
+        self.assertNotIn(b'Park Square', res.data)
+        res = self.client().get('/venues')
+        self.assertIn(b'Blues (1)', res.data)
+        self.assertIn(b'Park Square', res.data)
+
+    def test_venues_are_paged_by_venue_within_an_area(self):
+        db.session.add_all(Venue(name='Hall {}'.format(n), city='San Francisco', state='CA',
+                                 address='1 Main St', phone='415-000-1234') for n in range(3))
+        db.session.commit()
+        names = []
+        path = '/venues'
+        with mock.patch('app.VENUES_PER_PAGE', 2):
+            while path:
+                html = self.client().get(path).get_data(as_text=True)
+                names.extend(re.findall(r'<h5>(.*)</h5>', html))
+                more = re.search(r'<a href="([^"]*)">More venues', html)
+                path = more and unescape(more.group(1))
+
+        self.assertEqual(names, ['The Musical Hop', 'Hall 0', 'Hall 1', 'Hall 2'])
+        self.assertEqual(self.client().get('/venues?after=x').status_code, 400)
+
+    def test_upcoming_feed_json_and_html(self):
+        res = self.client().get('/upcoming.json')
+
+        self.assertEqual(res.status_code, 200)
+        body = res.get_json()
+        self.assertEqual([show['venue_name'] for show in body['data']], ['The Musical Hop'] * 2)
+        self.assertIsNone(body['next'])
+        self.assertIn(b'Guns N Petals', self.client().get('/upcoming').data)
+        self.assertIn(b"What's on", self.client().get('/').data)
+
+    def test_upcoming_feed_pages_and_staleness_bound(self):
+        ensure_fresh(300)
+        first, next_key = upcoming_page(1)
+        second, last_key = upcoming_page(1, after=next_key)
+        self.assertEqual(len(first), 1)
+        self.assertGreater(second[0].start_time, first[0].start_time)
+        self.assertIsNone(last_key)
+
+        db.session.add(Show(venue_id=self.venue_id, artist_id=self.artist_id,
+                            start_time=datetime.now() + timedelta(days=90)))
+        db.session.commit()
+        ensure_fresh(300)
+        self.assertEqual(len(upcoming_page(10)[0]), 2)
+        ensure_fresh(0)
+        self.assertEqual(len(upcoming_page(10)[0]), 3)
+
+    def test_empty_feed_is_not_refreshed_on_every_read(self):
+        Show.query.delete()
+        db.session.commit()
+        self.assertEqual(refresh_feed(), 0)
+        refreshes = []
+
+        def record(conn, cursor, statement, *args):
+            if statement.startswith('REFRESH'):
+                refreshes.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', record)
+
+        for path in ('/', '/upcoming', '/upcoming.json'):
+            self.assertEqual(self.client().get(path).status_code, 200)
+
+        self.assertEqual(refreshes, [])
+        self.assertLess(feed_age(), app.config['FEED_MAX_STALENESS'])
+
+    def test_seed_rejects_shows_without_venues(self):
+        result = app.test_cli_runner().invoke(
+            args=['fyyur', 'seed', '--reset', '--venues', '0', '--shows', '10'])
+
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('--shows', result.output)
+        self.assertEqual(Venue.query.count(), 1)
+
+    def test_404_unknown_artist(self):
+        res = self.client().get('/artists/1000')
+
+        self.assertEqual(res.status_code, 404)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
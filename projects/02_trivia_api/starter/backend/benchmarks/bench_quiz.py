@@ -0,0 +1,116 @@
+"""Cost of choosing the next quiz question.
+
+Fills a scratch database with --questions questions and plays --sessions
+quizzes side by side. Each round, every session asks for one more question
+in its category and excludes the questions it has already seen. The script
+times ``QuizPool.pick`` for every request, the full ``POST /quizzes``
+request for a sample of them, and the ``ORDER BY random()`` query the pool
+replaces for a few:
+
+    python benchmarks/bench_quiz.py --questions 1000000 --sessions 10000
+
+The target database is wiped, so never point --database-url at real data.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, text  # noqa: E402
+
+from flaskr import create_app  # noqa: E402
+from models import db, Question, Category, quiz_pool  # noqa: E402
+
+FILL_SQL = '''
+INSERT INTO questions (question, answer, category, difficulty)
+SELECT 'Question ' || n, 'Answer ' || n, n % :categories + 1, n % 5 + 1
+FROM generate_series(1, :count) AS n
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='postgresql:///trivia_bench')
+    parser.add_argument('--questions', type=int, default=1000000)
+    parser.add_argument('--categories', type=int, default=6)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='sampled POST /quizzes requests')
+    parser.add_argument('--naive', type=int, default=20,
+                        help='sampled ORDER BY random() queries')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def report(label, timings):
+    print('%-34s %8d %12.1f %12.1f' % (
+        label, len(timings), percentile(timings, 0.5) * 1e6, percentile(timings, 0.99) * 1e6))
+
+
+def fill(args):
+    db.drop_all()
+    db.create_all()
+    db.session.add_all(Category('Category {}'.format(n)) for n in range(1, args.categories + 1))
+    db.session.execute(text(FILL_SQL), {'categories': args.categories, 'count': args.questions})
+    db.session.commit()
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_url})
+    with app.app_context():
+        started = time.perf_counter()
+        fill(args)
+        print('filled %d questions in %.1fs' % (args.questions, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        pool = quiz_pool.get()
+        print('loaded the quiz pool in %.1fs' % (time.perf_counter() - started))
+
+        categories = [rng.randint(1, args.categories) for _ in range(args.sessions)]
+        seen = [[] for _ in range(args.sessions)]
+        picks = []
+        for _ in range(args.rounds):
+            for session in rng.sample(range(args.sessions), args.sessions):
+                started = time.perf_counter()
+                question_id = pool.pick(categories[session], seen[session], rng)
+                picks.append(time.perf_counter() - started)
+                seen[session].append(question_id)
+
+        # sessions after the last round, with the longest exclusion lists
+        sampled = rng.sample(range(args.sessions), min(args.requests, args.sessions))
+        client = app.test_client()
+        requests = []
+        for session in sampled:
+            body = {'previous_questions': seen[session],
+                    'quiz_category': {'id': categories[session]}}
+            started = time.perf_counter()
+            client.post('/quizzes', json=body)
+            requests.append(time.perf_counter() - started)
+
+        naive = []
+        for session in sampled[:args.naive]:
+            started = time.perf_counter()
+            Question.query.filter(Question.category == categories[session],
+                                  ~Question.id.in_(seen[session])).\
+                order_by(func.random()).first()
+            naive.append(time.perf_counter() - started)
+
+    print('%-34s %8s %12s %12s' % ('approach', 'calls', 'p50 us', 'p99 us'))
+    report('QuizPool.pick', picks)
+    report('POST /quizzes', requests)
+    report('ORDER BY random() query', naive)
+
+
+if __name__ == '__main__':
+    main()
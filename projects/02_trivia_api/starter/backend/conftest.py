@@ -0,0 +1,151 @@
+"""Fixtures for test_flaskr.py.
+
+The app and its schema are set up, and the rows of trivia.psql loaded,
+once per test session. Every test then runs inside one transaction on one
+connection. When the code under test commits, it only releases a
+SAVEPOINT inside that transaction. Rolling the transaction back afterwards
+leaves the next test with the rows of trivia.psql again.
+
+    pytest                                  # PostgreSQL, see TEST_DATABASE_URL
+    TEST_DATABASE_URL=sqlite:// pytest      # SQLite, in memory
+    pytest -n auto                          # in parallel, with pytest-xdist
+
+Under pytest-xdist every worker uses a database of its own, named after
+the worker (trivia_test_gw0, ...) and created when missing. The test
+databases are wiped, so never point TEST_DATABASE_URL at real data.
+"""
+import os
+import re
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from flaskr import create_app
+from models import db, invalidate_caches
+
+DATABASE_URL = os.environ.get('TEST_DATABASE_URL', 'postgresql://localhost:5432/trivia_test')
+DUMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trivia.psql')
+COPY = re.compile(r'^COPY public\.(\w+) \((.*)\) FROM stdin;$')
+COPY_ESCAPE = re.compile(r'\\(.)')
+COPY_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+
+def copy_value(value):
+    if value == '\\N':
+        return None
+    return COPY_ESCAPE.sub(lambda match: COPY_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def dump_rows(path=DUMP):
+    """{table: [row dict, ...]} from the COPY blocks of a pg_dump file."""
+    tables = {}
+    with open(path, encoding='utf-8') as dump:
+        lines = iter(dump.read().split('\n'))
+    for line in lines:
+        match = COPY.match(line)
+        if match is None:
+            continue
+        columns = [column.strip() for column in match.group(2).split(',')]
+        rows = tables.setdefault(match.group(1), [])
+        for line in lines:
+            if line == '\\.':
+                break
+            rows.append(dict(zip(columns, map(copy_value, line.split('\t')))))
+    return tables
+
+
+def load_dump(connection, path=DUMP):
+    """Replace the rows of the dumped tables with the ones in the dump.
+
+    The schema is the models' own (create_all and the upgrades in
+    setup_db), so the same rows load into PostgreSQL and SQLite.
+    """
+    tables = dump_rows(path)
+    for table in reversed(db.metadata.sorted_tables):
+        connection.execute(table.delete())
+    for table in db.metadata.sorted_tables:
+        rows = [{column: None if value is None else table.c[column].type.python_type(value)
+                 for column, value in row.items()} for row in tables.get(table.name, [])]
+        if rows:
+            connection.execute(table.insert(), rows)
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text(
+                "SELECT setval(pg_get_serial_sequence('{0}', 'id'), coalesce(max(id), 0) + 1, false) "
+                "FROM {0}".format(table.name)))
+
+
+def worker_database_url(worker):
+    """The URL of this pytest-xdist worker's database, created if missing."""
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() != 'postgresql' or worker == 'master':
+        return url
+    url = url.set(database='{}_{}'.format(url.database, worker))
+    admin = create_engine(url.set(database='postgres'), isolation_level='AUTOCOMMIT')
+    try:
+        with admin.connect() as connection:
+            exists = connection.execute(
+                text('SELECT 1 FROM pg_database WHERE datname = :name'),
+                {'name': url.database}).scalar()
+            if not exists:
+                connection.execute(text('CREATE DATABASE "{}"'.format(url.database)))
+    finally:
+        admin.dispose()
+    return url
+
+
+@pytest.fixture(scope='session')
+def app(request):
+    worker = getattr(request.config, 'workerinput', {}).get('workerid', 'master')
+    url = worker_database_url(worker)
+    config = {'SQLALCHEMY_DATABASE_URI': url.render_as_string(hide_password=False),
+              'TESTING': True}
+    if url.get_backend_name() == 'sqlite':
+        # one connection, so that an in-memory database outlives it being
+        # checked in; pysqlite's own transaction handling gets in the way
+        # of SAVEPOINTs, so BEGIN is emitted by SQLAlchemy instead
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'poolclass': StaticPool,
+            'connect_args': {'check_same_thread': False, 'isolation_level': None}}
+    app = create_app(config)
+    with app.app_context():
+        if url.get_backend_name() == 'sqlite':
+            event.listen(db.engine, 'begin', lambda connection: connection.exec_driver_sql('BEGIN'))
+        with db.engine.begin() as connection:
+            load_dump(connection)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def transaction(app):
+    """Run the test in a transaction that is rolled back afterwards.
+
+    Flask-SQLAlchemy's sessions always pick the app's engine, whatever they
+    are bound to, so db.session is swapped for one bound to the test's
+    connection for the length of the test.
+    """
+    with app.app_context():
+        connection = db.engine.connect()
+        outer = connection.begin()
+        session = db.session
+        session.remove()
+        db.session = scoped_session(sessionmaker(
+            bind=connection, join_transaction_mode='create_savepoint'))
+        invalidate_caches()
+        try:
+            yield connection
+        finally:
+            db.session.remove()
+            db.session = session
+            outer.rollback()
+            connection.close()
+            invalidate_caches()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
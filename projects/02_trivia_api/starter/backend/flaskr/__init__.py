@@ -4,101 +4,210 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
-from models import setup_db, Question, Category
+from models import setup_db, database_path, db, Question, Category, question_count, \
+  category_map, quiz_pool, search_index
+from search import search_ids
 
 QUESTIONS_PER_PAGE = 10
+MAX_QUESTIONS_PER_PAGE = 100
+
+def cursor_args(request):
+  '''
+  Reads the keyset cursor of a question listing: ?after=<id of the last
+  question seen>&limit=<page size>. Pages are ordered by id and each one
+  starts with an index seek on the primary key, so a page deep into the
+  bank costs the same as the first one, unlike OFFSET paging.
+  '''
+  try:
+    after = int(request.args.get('after', 0))
+    limit = int(request.args.get('limit', QUESTIONS_PER_PAGE))
+  except ValueError:
+    abort(400)
+  if after < 0 or not 0 < limit <= MAX_QUESTIONS_PER_PAGE:
+    abort(400)
+  return after, limit
+
+def json_body(request):
+  '''
+  Reads the JSON object of a POST. A missing or malformed body reads as
+  an empty object, so the handler rejects it for its missing fields; any
+  other JSON value, such as a list or a string, is rejected with a 422.
+  '''
+  body = request.get_json(silent=True)
+  if body is None:
+    return {}
+  if not isinstance(body, dict):
+    abort(422)
+  return body
+
+def page_after(query, after, limit):
+  # one extra row tells whether there is a next page without counting
+  questions = query.filter(Question.id > after).order_by(Question.id).limit(limit + 1).all()
+  next_cursor = questions[limit - 1].id if len(questions) > limit else None
+  return [question.format() for question in questions[:limit]], next_cursor
+
+def next_quiz_question(category, previous):
+  # the pool can trail deletes made by other processes; reload it once if so
+  for attempt in range(2):
+    question_id = quiz_pool.get().pick(category, previous)
+    if question_id is None:
+      return None
+    question = Question.query.filter(Question.id == question_id).one_or_none()
+    if question is not None:
+      return question
+    quiz_pool.invalidate()
+  return None
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
-  setup_db(app)
-  
-  '''
-  @TODO: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
-  '''
-
-  '''
-  @TODO: Use the after_request decorator to set Access-Control-Allow
-  '''
-
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests 
-  for all available categories.
-  '''
-
+  if test_config is not None:
+    app.config.update(test_config)
+  setup_db(app, app.config.get('SQLALCHEMY_DATABASE_URI', database_path))
+  CORS(app, resources={r'/*': {'origins': '*'}})
+
+  @app.after_request
+  def after_request(response):
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
+    response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PATCH,DELETE,OPTIONS'
+    return response
+
+  @app.route('/categories')
+  def get_categories():
+    return jsonify({
+      'success': True,
+      'categories': category_map.get()
+    })
+
+  @app.route('/questions')
+  def get_questions():
+    after, limit = cursor_args(request)
+    questions, next_cursor = page_after(Question.query, after, limit)
+    return jsonify({
+      'success': True,
+      'questions': questions,
+      'total_questions': question_count.get(),
+      'categories': category_map.get(),
+      'current_category': None,
+      'next_cursor': next_cursor
+    })
+
+  @app.route('/questions/<int:question_id>', methods=['DELETE'])
+  def delete_question(question_id):
+    question = Question.query.filter(Question.id == question_id).one_or_none()
+    if question is None:
+      abort(404)
+    question.delete()
+    return jsonify({
+      'success': True,
+      'deleted': question_id,
+      'total_questions': question_count.get()
+    })
+
+  @app.route('/questions', methods=['POST'])
+  def create_question():
+    body = json_body(request)
+    fields = ('question', 'answer', 'category', 'difficulty')
+    if any(not body.get(field) for field in fields):
+      abort(422)
+    try:
+      category_id = int(body['category'])
+    except (TypeError, ValueError):
+      abort(422)
+    if category_id not in category_map.get():
+      abort(422)
+    question = Question(**{field: body[field] for field in fields})
+    question.category = category_id
+    question.insert()
+    return jsonify({
+      'success': True,
+      'created': question.id,
+      'total_questions': question_count.get()
+    }), 201
+
+  @app.route('/questions/search', methods=['POST'])
+  def search_questions():
+    body = json_body(request)
+    term = body.get('searchTerm')
+    try:
+      limit = int(body.get('limit', QUESTIONS_PER_PAGE))
+      offset = int(body.get('offset', 0))
+    except (TypeError, ValueError):
+      abort(422)
+    if not isinstance(term, str) or offset < 0 or not 0 < limit <= MAX_QUESTIONS_PER_PAGE:
+      abort(422)
+    ids = search_ids(db.session, term, limit + 1, offset, search_index.get)
+    found = {question.id: question
+             for question in Question.query.filter(Question.id.in_(ids[:limit]))}
+    return jsonify({
+      'success': True,
+      'questions': [found[question_id].format() for question_id in ids[:limit]
+                    if question_id in found],
+      'total_questions': question_count.get(),
+      'current_category': None,
+      'next_offset': offset + limit if len(ids) > limit else None
+    })
+
+  @app.route('/categories/<int:category_id>/questions')
+  def get_category_questions(category_id):
+    categories = category_map.get()
+    if category_id not in categories:
+      abort(404)
+    after, limit = cursor_args(request)
+    questions, next_cursor = page_after(
+      Question.query.filter(Question.category == category_id), after, limit)
+    return jsonify({
+      'success': True,
+      'questions': questions,
+      'total_questions': quiz_pool.get().count(category_id),
+      'categories': categories,
+      'current_category': category_id,
+      'next_cursor': next_cursor
+    })
+
+  @app.route('/quizzes', methods=['POST'])
+  def play_quiz():
+    body = json_body(request)
+    quiz_category = body.get('quiz_category') or {}
+    try:
+      category_id = int(quiz_category.get('id', 0))
+      previous = set(int(question_id) for question_id in body.get('previous_questions') or [])
+    except (AttributeError, TypeError, ValueError):
+      abort(422)
+    # id 0 is "All"
+    if category_id and category_id not in category_map.get():
+      abort(404)
+    question = next_quiz_question(category_id or None, previous)
+    return jsonify({
+      'success': True,
+      'question': question.format() if question else None
+    })
+
+  def error(status, message):
+    return jsonify({
+      'success': False,
+      'error': status,
+      'message': message
+    }), status
+
+  @app.errorhandler(400)
+  def bad_request(e):
+    return error(400, 'bad request')
+
+  @app.errorhandler(404)
+  def not_found(e):
+    return error(404, 'resource not found')
+
+  @app.errorhandler(405)
+  def method_not_allowed(e):
+    return error(405, 'method not allowed')
+
+  @app.errorhandler(422)
+  def unprocessable(e):
+    return error(422, 'unprocessable')
+
+  @app.errorhandler(500)
+  def server_error(e):
+    return error(500, 'internal server error')
 
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests for questions, 
-  including pagination (every 10 questions). 
-  This endpoint should return a list of questions, 
-  number of total questions, current category, categories. 
-
-  TEST: At this point, when you start the application
-  you should see questions and categories generated,
-  ten questions per page and pagination at the bottom of the screen for three pages.
-  Clicking on the page numbers should update the questions. 
-  '''
-
-  '''
-  @TODO: 
-  Create an endpoint to DELETE question using a question ID. 
-
-  TEST: When you click the trash icon next to a question, the question will be removed.
-  This removal will persist in the database and when you refresh the page. 
-  '''
-
-  '''
-  @TODO: 
-  Create an endpoint to POST a new question, 
-  which will require the question and answer text, 
-  category, and difficulty score.
-
-  TEST: When you submit a question on the "Add" tab, 
-  the form will clear and the question will appear at the end of the last page
-  of the questions list in the "List" tab.  
-  '''
-
-  '''
-  @TODO: 
-  Create a POST endpoint to get questions based on a search term. 
-  It should return any questions for whom the search term 
-  is a substring of the question. 
-
-  TEST: Search by any phrase. The questions list will update to include 
-  only question that include that string within their question. 
-  Try using the word "title" to start. 
-  '''
-
-  '''
-  @TODO: 
-  Create a GET endpoint to get questions based on category. 
-
-  TEST: In the "List" tab / main screen, clicking on one of the 
-  categories in the left column will cause only questions of that 
-  category to be shown. 
-  '''
-
-
-  '''
-  @TODO: 
-  Create a POST endpoint to get questions to play the quiz. 
-  This endpoint should take category and previous question parameters 
-  and return a random questions within the given category, 
-  if provided, and that is not one of the previous questions. 
-
-  TEST: In the "Play" tab, after a user selects "All" or a category,
-  one question at a time is displayed, the user is allowed to answer
-  and shown whether they were correct or not. 
-  '''
-
-  '''
-  @TODO: 
-  Create error handlers for all expected errors 
-  including 404 and 422. 
-  '''
-  
   return app
-
-    
\ No newline at end of file
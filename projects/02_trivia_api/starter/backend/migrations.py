@@ -0,0 +1,73 @@
+'''
+Schema upgrades for existing databases.
+
+db.create_all() only creates missing tables, so setup_db runs upgrade() to
+bring tables made by older versions of the models up to date. Every step
+looks at the schema first and only changes what is out of date, so running
+it again is a no-op.
+'''
+import logging
+
+from sqlalchemy import inspect, text, Integer
+
+log = logging.getLogger(__name__)
+
+CATEGORY_INDEX = 'questions_category_id_idx'
+
+# questions.category used to be a String holding the category id; a few
+# rows may hold the category's name instead
+CATEGORY_NAMES_TO_IDS_SQL = '''
+UPDATE questions SET category = categories.id::text
+FROM categories
+WHERE lower(trim(questions.category)) = lower(categories.type)
+'''
+
+CATEGORY_TO_INTEGER_SQL = '''
+ALTER TABLE questions ALTER COLUMN category TYPE integer
+  USING CASE WHEN trim(category) ~ '^[0-9]+$' THEN trim(category)::integer END
+'''
+
+# nothing checked the String column against categories
+NULL_ORPHAN_CATEGORIES_SQL = '''
+UPDATE questions SET category = NULL
+WHERE category IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM categories WHERE categories.id = questions.category)
+'''
+
+ADD_CATEGORY_FOREIGN_KEY_SQL = '''
+ALTER TABLE questions ADD CONSTRAINT questions_category_fkey FOREIGN KEY (category)
+  REFERENCES categories (id) ON UPDATE CASCADE ON DELETE SET NULL
+'''
+
+CREATE_CATEGORY_INDEX_SQL = '''
+CREATE INDEX IF NOT EXISTS {} ON questions (category, id)
+'''.format(CATEGORY_INDEX)
+
+def upgrade_question_category(connection):
+  '''
+  Makes questions.category an integer foreign key to categories.id with a
+  (category, id) index. Category ids stored as text become integers,
+  category names become their ids, and anything else is set to NULL.
+  '''
+  inspector = inspect(connection)
+  if connection.dialect.name == 'postgresql':
+    column = [column for column in inspector.get_columns('questions')
+              if column['name'] == 'category'][0]
+    if not isinstance(column['type'], Integer):
+      connection.execute(text(CATEGORY_NAMES_TO_IDS_SQL))
+      connection.execute(text(CATEGORY_TO_INTEGER_SQL))
+    if not any(foreign_key['referred_table'] == 'categories'
+               for foreign_key in inspector.get_foreign_keys('questions')):
+      orphans = connection.execute(text(NULL_ORPHAN_CATEGORIES_SQL)).rowcount
+      if orphans:
+        log.warning('%d questions had no valid category; their category is now NULL', orphans)
+      connection.execute(text(ADD_CATEGORY_FOREIGN_KEY_SQL))
+  # other databases are created by create_all(), which makes the column right
+  connection.execute(text(CREATE_CATEGORY_INDEX_SQL))
+
+STEPS = [upgrade_question_category]
+
+def upgrade(engine):
+  with engine.begin() as connection:
+    for step in STEPS:
+      step(connection)
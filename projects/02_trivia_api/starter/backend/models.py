@@ -1,10 +1,17 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+import threading
+import time
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, create_engine, text
 from flask_sqlalchemy import SQLAlchemy
 import json
 
+import migrations
+from quiz import QuizPool
+from search import InvertedIndex, SEARCH_DDL
+
 database_name = "trivia"
-database_path = "postgres://{}/{}".format('localhost:5432', database_name)
+database_path = os.environ.get(
+    'DATABASE_URL', "postgresql://{}/{}".format('localhost:5432', database_name))
 
 db = SQLAlchemy()
 
@@ -15,9 +22,58 @@ setup_db(app)
 def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.app = app
     db.init_app(app)
-    db.create_all()
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine)
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text(SEARCH_DDL))
+            db.session.commit()
+    invalidate_caches()
+
+'''
+invalidate_caches()
+    drops every value cached from the database, for when rows change behind
+    the models' back
+'''
+def invalidate_caches():
+    for cached in (question_count, category_map, quiz_pool, search_index):
+        cached.invalidate()
+
+'''
+CachedValue
+    a value loaded from the database on first use and then kept in memory.
+    Writes adjust it in place or invalidate it. Every worker process keeps
+    its own copy, so it is also reloaded once it is older than max_age
+    seconds, which bounds how long writes made by other processes go unseen.
+'''
+class CachedValue(object):
+  def __init__(self, load, max_age=60):
+    self.load = load
+    self.max_age = max_age
+    self.lock = threading.Lock()
+    self.value = None
+    self.loaded_at = None
+
+  def get(self):
+    with self.lock:
+      if self.value is None or time.monotonic() - self.loaded_at > self.max_age:
+        self.value = self.load()
+        self.loaded_at = time.monotonic()
+      return self.value
+
+  def peek(self):
+    '''the value if it is loaded, without loading it'''
+    return self.value
+
+  def adjust(self, delta):
+    with self.lock:
+      if self.value is not None:
+        self.value += delta
+
+  def invalidate(self):
+    with self.lock:
+      self.value = None
 
 '''
 Question
@@ -25,11 +81,13 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  # listing a category pages through (category, id) without touching other rows
+  __table_args__ = (Index(migrations.CATEGORY_INDEX, 'category', 'id'),)
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
   answer = Column(String)
-  category = Column(String)
+  category = Column(Integer, ForeignKey('categories.id', onupdate='CASCADE', ondelete='SET NULL'))
   difficulty = Column(Integer)
 
   def __init__(self, question, answer, category, difficulty):
@@ -41,13 +99,31 @@ class Question(db.Model):
   def insert(self):
     db.session.add(self)
     db.session.commit()
+    question_count.adjust(1)
+    pool = quiz_pool.peek()
+    if pool is not None:
+      pool.add(self.category, self.id)
+    index = search_index.peek()
+    if index is not None:
+      index.add(self.id, self.question)
   
   def update(self):
     db.session.commit()
+    # the category and text may have changed, and their old values are gone by now
+    quiz_pool.invalidate()
+    search_index.invalidate()
 
   def delete(self):
+    question_id, category, question = self.id, self.category, self.question
     db.session.delete(self)
     db.session.commit()
+    question_count.adjust(-1)
+    pool = quiz_pool.peek()
+    if pool is not None:
+      pool.remove(category, question_id)
+    index = search_index.peek()
+    if index is not None:
+      index.remove(question_id, question)
 
   def format(self):
     return {
@@ -71,8 +147,46 @@ class Category(db.Model):
   def __init__(self, type):
     self.type = type
 
+  def insert(self):
+    db.session.add(self)
+    db.session.commit()
+    category_map.invalidate()
+
+  def update(self):
+    db.session.commit()
+    category_map.invalidate()
+
+  def delete(self):
+    db.session.delete(self)
+    db.session.commit()
+    category_map.invalidate()
+    # the database set the category of its questions to NULL
+    quiz_pool.invalidate()
+
   def format(self):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+question_count
+    total number of questions, kept up to date by Question.insert()/delete()
+    so listings don't run COUNT(*) for every page
+category_map
+    {id: type} of every category, reloaded after any Category write
+quiz_pool
+    QuizPool of every question id by category, kept up to date by
+    Question.insert()/delete(); loading it reads the whole table, so it is
+    refreshed less often
+search_index
+    InvertedIndex over the question text, for databases without full text
+    search (see search.py); only loaded when searched
+'''
+question_count = CachedValue(lambda: Question.query.count())
+category_map = CachedValue(
+    lambda: {category.id: category.type for category in Category.query.order_by(Category.id)})
+quiz_pool = CachedValue(
+    lambda: QuizPool(db.session.query(Question.category, Question.id)), max_age=600)
+search_index = CachedValue(
+    lambda: InvertedIndex(db.session.query(Question.id, Question.question)), max_age=600)
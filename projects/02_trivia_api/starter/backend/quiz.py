@@ -0,0 +1,79 @@
+import bisect
+import random
+import threading
+from array import array
+
+'''
+QuizPool
+    question ids kept in memory for quiz play: one sorted array per category
+    and one with every id, uncategorized ones included (category None).
+    pick() draws an id uniformly from a category, leaving out the ids a
+    player has already seen, without scanning the category or retrying: it
+    looks up where the excluded ids sit in the array, draws a position among
+    the remaining ones and steps it past the excluded positions. That costs
+    O(m log n) for m excluded ids, however many questions there are, where
+    ORDER BY random() or filtering a list of ids reads the whole category.
+'''
+class QuizPool(object):
+  def __init__(self, rows=()):
+    self.lock = threading.Lock()
+    self.ids = {None: array('q')}
+    for category, question_id in sorted(rows, key=lambda row: row[1]):
+      if category is not None:
+        self.ids.setdefault(category, array('q')).append(question_id)
+      self.ids[None].append(question_id)
+
+  def __len__(self):
+    return len(self.ids[None])
+
+  def count(self, category=None):
+    return len(self.ids.get(category, ()))
+
+  def _insert(self, ids, question_id):
+    if not ids or ids[-1] < question_id:
+      ids.append(question_id)
+    else:
+      position = bisect.bisect_left(ids, question_id)
+      if position == len(ids) or ids[position] != question_id:
+        ids.insert(position, question_id)
+
+  def _remove(self, ids, question_id):
+    position = bisect.bisect_left(ids, question_id)
+    if position < len(ids) and ids[position] == question_id:
+      del ids[position]
+
+  def add(self, category, question_id):
+    with self.lock:
+      if category is not None:
+        self._insert(self.ids.setdefault(category, array('q')), question_id)
+      self._insert(self.ids[None], question_id)
+
+  def remove(self, category, question_id):
+    with self.lock:
+      if category is not None and category in self.ids:
+        self._remove(self.ids[category], question_id)
+      self._remove(self.ids[None], question_id)
+
+  def pick(self, category=None, exclude=(), rng=random):
+    '''
+    Returns a random id in category (None for any) that is not in exclude,
+    or None once every question in it has been excluded.
+    '''
+    with self.lock:
+      ids = self.ids.get(category)
+      if not ids:
+        return None
+      skipped = set()
+      for question_id in exclude:
+        position = bisect.bisect_left(ids, question_id)
+        if position < len(ids) and ids[position] == question_id:
+          skipped.add(position)
+      remaining = len(ids) - len(skipped)
+      if remaining <= 0:
+        return None
+      position = rng.randrange(remaining)
+      for excluded in sorted(skipped):
+        if excluded > position:
+          break
+        position += 1
+      return ids[position]
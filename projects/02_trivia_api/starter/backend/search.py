@@ -0,0 +1,107 @@
+'''
+Full text search over Question.question.
+
+On PostgreSQL a GIN index over the question's tsvector (created by
+setup_db) answers the search and ts_rank orders the matches. Every word of
+the search term matches as a prefix ("tit" finds "title"), and all of them
+must appear.
+
+Other databases, such as SQLite, get InvertedIndex, the
+same lookup kept in memory: each word maps to the questions that contain
+it, and questions are ranked by how many times they contain the words.
+It doesn't stem words like PostgreSQL's english configuration does.
+'''
+import bisect
+import re
+import threading
+
+from sqlalchemy import text
+
+WORD = re.compile(r'[^\W_]+')
+
+SEARCH_DDL = '''
+CREATE INDEX IF NOT EXISTS questions_search_idx ON questions
+  USING GIN (to_tsvector('english', coalesce(question, '')))
+'''
+
+SEARCH_SQL = '''
+SELECT id
+FROM questions, to_tsquery('english', :query) AS query
+WHERE to_tsvector('english', coalesce(question, '')) @@ query
+ORDER BY ts_rank(to_tsvector('english', coalesce(question, '')), query) DESC, id
+LIMIT :limit OFFSET :offset
+'''
+
+def words(value):
+  return [word.lower() for word in WORD.findall(value or '')]
+
+def prefix_query(term):
+  '''"Tom Han" -> "tom:* & han:*"'''
+  return ' & '.join(word + ':*' for word in words(term))
+
+def search_ids(session, term, limit, offset=0, fallback_index=None):
+  '''
+  Ids of the questions matching term, best first. fallback_index returns
+  the InvertedIndex to search on databases other than PostgreSQL.
+  '''
+  if not words(term):
+    return []
+  if session.get_bind().dialect.name == 'postgresql':
+    return session.execute(text(SEARCH_SQL), {
+      'query': prefix_query(term), 'limit': limit, 'offset': offset}).scalars().all()
+  return fallback_index().search(term, limit, offset)
+
+'''
+InvertedIndex
+    word -> {question id: occurrences}, plus the sorted vocabulary so that
+    a prefix is looked up with a binary search instead of a scan
+'''
+class InvertedIndex(object):
+  def __init__(self, rows=()):
+    self.lock = threading.Lock()
+    self.postings = {}
+    for question_id, question in rows:
+      for word in words(question):
+        matches = self.postings.setdefault(word, {})
+        matches[question_id] = matches.get(question_id, 0) + 1
+    self.vocabulary = sorted(self.postings)
+
+  def add(self, question_id, question):
+    with self.lock:
+      for word in words(question):
+        if word not in self.postings:
+          self.postings[word] = {}
+          bisect.insort(self.vocabulary, word)
+        matches = self.postings[word]
+        matches[question_id] = matches.get(question_id, 0) + 1
+
+  def remove(self, question_id, question):
+    with self.lock:
+      for word in set(words(question)):
+        matches = self.postings.get(word, {})
+        matches.pop(question_id, None)
+        if word in self.postings and not matches:
+          del self.postings[word]
+          del self.vocabulary[bisect.bisect_left(self.vocabulary, word)]
+
+  def _prefix_matches(self, prefix):
+    matches = {}
+    start = bisect.bisect_left(self.vocabulary, prefix)
+    for word in self.vocabulary[start:]:
+      if not word.startswith(prefix):
+        break
+      for question_id, count in self.postings[word].items():
+        matches[question_id] = matches.get(question_id, 0) + count
+    return matches
+
+  def search(self, term, limit, offset=0):
+    with self.lock:
+      scores = None
+      for prefix in words(term):
+        matches = self._prefix_matches(prefix)
+        if scores is not None:
+          matches = {question_id: scores[question_id] + count
+                     for question_id, count in matches.items() if question_id in scores}
+        scores = matches
+      ranked = sorted(scores or {}, key=lambda question_id: (-scores[question_id], question_id))
+      return ranked[offset:offset + limit]
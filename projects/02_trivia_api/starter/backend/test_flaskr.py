@@ -1,40 +1,286 @@
-import os
-import unittest
-import json
-from flask_sqlalchemy import SQLAlchemy
-
-from flaskr import create_app
-from models import setup_db, Question, Category
-
-
-class TriviaTestCase(unittest.TestCase):
-    """This class represents the trivia test case"""
-
-    def setUp(self):
-        """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
-        self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
-
-        # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
-    
-    def tearDown(self):
-        """Executed after reach test"""
-        pass
-
-    """
-    TODO
-    Write at least one test for each test for successful operation and for expected errors.
-    """
-
-
-# Make the tests conveniently executable
-if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+"""Tests of the trivia API. The fixtures are in conftest.py.
+
+Every test starts from the rows of trivia.psql (6 categories, 19
+questions), and whatever it writes is rolled back afterwards.
+"""
+import random
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+import migrations
+from models import db, Question, Category
+from quiz import QuizPool
+from search import InvertedIndex
+
+QUESTIONS = 19
+ART = 2
+ART_QUESTIONS = [16, 17, 18, 19]
+
+
+def add_questions(texts, category=ART):
+    ids = []
+    for text in texts:
+        question = Question(text, 'Answer', category, 1)
+        question.insert()
+        ids.append(question.id)
+    return ids
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run while the test uses it, SAVEPOINTs left out."""
+    run = []
+
+    def record(conn, cursor, statement, *args):
+        if 'SAVEPOINT' not in statement:
+            run.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield run
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_get_categories(client):
+    res = client.get('/categories')
+    data = res.get_json()
+
+    assert res.status_code == 200
+    assert data['categories'] == {'1': 'Science', '2': 'Art', '3': 'Geography',
+                                  '4': 'History', '5': 'Entertainment', '6': 'Sports'}
+
+
+def test_questions_are_paged_by_cursor(client):
+    seen = []
+    path = '/questions'
+    while True:
+        data = client.get(path).get_json()
+        assert data['success']
+        assert data['total_questions'] == QUESTIONS
+        assert len(data['questions']) <= 10
+        seen.extend(question['id'] for question in data['questions'])
+        if data['next_cursor'] is None:
+            break
+        assert data['next_cursor'] == seen[-1]
+        path = '/questions?after={}'.format(data['next_cursor'])
+
+    assert len(seen) == QUESTIONS
+    assert seen == sorted(seen)
+
+
+def test_question_pages_reuse_cached_count_and_categories(client, statements):
+    client.get('/questions')
+    del statements[:]
+    res = client.get('/questions?after=1&limit=5')
+
+    assert res.status_code == 200
+    assert len(statements) == 1
+    assert 'count(' not in statements[0].lower()
+
+
+@pytest.mark.parametrize('path', ['/questions?after=abc', '/questions?limit=0',
+                                  '/questions?after=-1'])
+def test_400_for_bad_cursor(client, path):
+    res = client.get(path)
+
+    assert res.status_code == 400
+    assert not res.get_json()['success']
+
+
+def test_insert_and_delete_update_cached_count(client):
+    client.get('/questions')
+    res = client.post('/questions', json={
+        'question': 'New?', 'answer': 'Yes', 'category': ART, 'difficulty': 2})
+    data = res.get_json()
+    assert res.status_code == 201
+    assert data['total_questions'] == QUESTIONS + 1
+
+    res = client.delete('/questions/{}'.format(data['created']))
+    assert res.get_json()['total_questions'] == QUESTIONS
+    assert client.get('/questions').get_json()['total_questions'] == QUESTIONS
+
+
+def test_422_for_incomplete_question(client):
+    res = client.post('/questions', json={'question': 'New?'})
+
+    assert res.status_code == 422
+    assert not res.get_json()['success']
+
+    res = client.post('/questions', json={
+        'question': 'New?', 'answer': 'Yes', 'category': 1000000, 'difficulty': 2})
+    assert res.status_code == 422
+
+
+@pytest.mark.parametrize('path', ['/questions', '/questions/search', '/quizzes'])
+@pytest.mark.parametrize('body', [[1], 'x', 3])
+def test_422_for_json_that_is_not_an_object(client, path, body):
+    res = client.post(path, json=body)
+
+    assert res.status_code == 422
+    assert not res.get_json()['success']
+
+
+def test_404_when_deleting_missing_question(client):
+    res = client.delete('/questions/1000000')
+
+    assert res.status_code == 404
+    assert res.get_json()['message'] == 'resource not found'
+
+
+def test_category_write_invalidates_map(app, client):
+    client.get('/categories')
+    with app.app_context():
+        Category('Music').insert()
+
+    assert 'Music' in client.get('/categories').get_json()['categories'].values()
+
+
+def test_quiz_never_repeats_a_question(client):
+    previous = []
+    while True:
+        res = client.post('/quizzes', json={
+            'previous_questions': previous, 'quiz_category': {'type': 'Art', 'id': ART}})
+        question = res.get_json()['question']
+        if question is None:
+            break
+        assert question['category'] == ART
+        assert question['id'] not in previous
+        previous.append(question['id'])
+
+    assert sorted(previous) == ART_QUESTIONS
+
+
+def test_quiz_sees_inserted_and_deleted_questions(app, client):
+    with app.app_context():
+        ids = [question.id for question in Question.query.all()]
+        client.post('/quizzes', json={'previous_questions': [], 'quiz_category': {'id': 0}})
+        Question.query.filter(Question.id == ids[0]).one().delete()
+        new_id, = add_questions(['New?'])
+
+    res = client.post('/quizzes', json={
+        'previous_questions': ids[1:], 'quiz_category': {'type': 'click', 'id': 0}})
+
+    assert res.get_json()['question']['id'] == new_id
+
+
+def test_quiz_errors(client):
+    res = client.post('/quizzes', json={'previous_questions': 'x', 'quiz_category': {'id': 0}})
+    assert res.status_code == 422
+    res = client.post('/quizzes', json={'previous_questions': [], 'quiz_category': {'id': 1000000}})
+    assert res.status_code == 404
+
+
+def test_quiz_pool_picks_uniformly_around_excluded_ids():
+    pool = QuizPool([(1, 10), (2, 20), (1, 30), (1, 40), (1, 50)])
+    rng = random.Random(1)
+    picks = [pool.pick(1, {10, 40, 99}, rng) for _ in range(3000)]
+
+    assert set(picks) == {30, 50}
+    assert abs(picks.count(30) / 3000.0 - 0.5) < 0.05
+    assert pool.pick(1, {10, 30, 40, 50}) is None
+    assert pool.pick(3) is None
+    pool.add(3, 5)
+    pool.remove(1, 30)
+    assert pool.pick(3) == 5
+    assert pool.pick(None, {5, 10, 20, 40}) == 50
+
+
+def test_search_ranks_prefix_matches(app, client):
+    with app.app_context():
+        add_questions(['Which title did Tom Hanks win? Title, title!', 'Who wrote the titles?'])
+    data = client.post('/questions/search', json={'searchTerm': 'TIT'}).get_json()
+
+    assert len(data['questions']) == 3
+    assert data['questions'][0]['question'].startswith('Which title')
+    assert data['next_offset'] is None
+
+    data = client.post('/questions/search', json={'searchTerm': 'title tim'}).get_json()
+    assert [question['id'] for question in data['questions']] == [6]
+
+
+def test_search_pages_with_limit(app, client):
+    with app.app_context():
+        add_questions('Quiz question {}?'.format(n) for n in range(25))
+    data = client.post('/questions/search', json={'searchTerm': 'quiz', 'limit': 10}).get_json()
+    assert len(data['questions']) == 10
+    assert data['next_offset'] == 10
+
+    data = client.post('/questions/search', json={
+        'searchTerm': 'quiz', 'limit': 10, 'offset': 20}).get_json()
+    assert len(data['questions']) == 5
+    assert data['next_offset'] is None
+
+
+def test_search_errors(client):
+    res = client.post('/questions/search', json={'searchTerm': 'a', 'limit': 0})
+    assert res.status_code == 422
+    res = client.post('/questions/search', json={})
+    assert res.status_code == 422
+    data = client.post('/questions/search', json={'searchTerm': '?!'}).get_json()
+    assert data['questions'] == []
+
+
+def test_inverted_index_matches_prefixes_and_follows_writes():
+    index = InvertedIndex([(1, 'The title, the TITLE'), (2, 'A titled film'), (3, 'Tom Hanks')])
+
+    assert index.search('tit', 10) == [1, 2]
+    assert index.search('tit film', 10) == [2]
+    assert index.search('tit', 1, 1) == [2]
+    index.add(4, 'Title title title')
+    index.remove(2, 'A titled film')
+    assert index.search('tit', 10) == [4, 1]
+    assert index.search('film', 10) == []
+    assert index.vocabulary == sorted(index.postings)
+
+
+def test_category_questions_are_paged_by_cursor(client):
+    data = client.get('/categories/{}/questions?limit=3'.format(ART)).get_json()
+
+    assert data['current_category'] == ART
+    assert data['total_questions'] == len(ART_QUESTIONS)
+    assert [question['id'] for question in data['questions']] == ART_QUESTIONS[:3]
+
+    data = client.get('/categories/{}/questions?after={}'.format(
+        ART, data['next_cursor'])).get_json()
+    assert [question['id'] for question in data['questions']] == ART_QUESTIONS[3:]
+    assert data['next_cursor'] is None
+
+    assert client.get('/categories/1000000/questions').status_code == 404
+
+
+def test_upgrade_makes_string_categories_a_foreign_key(app):
+    with app.app_context():
+        connection = db.session.connection()
+        if connection.dialect.name != 'postgresql':
+            pytest.skip('other databases are created with the integer column')
+        connection.execute(text('DROP TABLE questions'))
+        connection.execute(text(
+            'CREATE TABLE questions (id serial PRIMARY KEY, question varchar, '
+            'answer varchar, category varchar, difficulty integer)'))
+        connection.execute(text(
+            "INSERT INTO questions (question, answer, category, difficulty) VALUES "
+            "('a', 'a', ' 2 ', 1), ('b', 'b', 'art', 1), ('c', 'c', '1000000', 1), "
+            "('d', 'd', 'x', 1), ('e', 'e', NULL, 1)"))
+
+        migrations.upgrade_question_category(connection)
+        migrations.upgrade_question_category(connection)
+
+        inspector = inspect(connection)
+        assert [column['type'].python_type for column in inspector.get_columns('questions')
+                if column['name'] == 'category'] == [int]
+        assert [foreign_key['referred_table']
+                for foreign_key in inspector.get_foreign_keys('questions')] == ['categories']
+        assert ['category', 'id'] in [index['column_names']
+                                      for index in inspector.get_indexes('questions')]
+        assert connection.execute(text(
+            'SELECT question, category FROM questions ORDER BY id')).all() == \
+            [('a', ART), ('b', ART), ('c', None), ('d', None), ('e', None)]
+
+
+def test_tests_start_from_trivia_psql(app):
+    with app.app_context():
+        assert Question.query.count() == QUESTIONS
+        assert Category.query.count() == 6
+        new_id, = add_questions(['Numbered after the dump?'])
+
+    assert new_id > 23